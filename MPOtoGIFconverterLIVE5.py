@@ -1,5 +1,6 @@
 import os
 import sys
+import threading
 import tkinter as tk
 from PIL import Image, ImageSequence, ImageTk
 from datetime import datetime
@@ -18,9 +19,25 @@ stop_preview = False
 skip_file = False
 exit_script = False
 base_filename = ""  # Will be set dynamically
+# The input thread changes the settings and images while the Tk loop shows them,
+# both only touch them while holding this lock
+state_lock = threading.Lock()
+
+# === DIRECTORY SCAN ===
+def scan_mpo_files(root, relative=""):
+    # MPO files in root and all its subfolders (like DCIM/1xxNIN03), folder by folder in sorted order
+    folder = os.path.join(root, relative)
+    with os.scandir(folder) as entries:
+        entries = sorted(entries, key=lambda entry: entry.name)
+    for entry in entries:
+        if not entry.is_dir() and entry.name.lower().endswith(".mpo"):
+            yield os.path.join(relative, entry.name)
+    for entry in entries:
+        if entry.is_dir():
+            yield from scan_mpo_files(root, os.path.join(relative, entry.name))
 
 # === IMAGE PROCESSING ===
-def process_images(mpo_path, overlap):
+def process_images(mpo_path, overlap, crop):
     mpo = Image.open(mpo_path)
     frames = [frame.copy() for frame in ImageSequence.Iterator(mpo)]
     if len(frames) < 2:
@@ -60,7 +77,11 @@ def create_gif(images, output_path, duration):
 def show_preview(mpo_path):
     global left_img, right_img, toggle, stop_preview
 
-    left_img, right_img = process_images(mpo_path, overlap)
+    with state_lock:
+        settings = (overlap, dict(crop))
+    images = process_images(mpo_path, *settings)
+    with state_lock:
+        left_img, right_img = images
     stop_preview = False
     toggle = True
 
@@ -73,17 +94,25 @@ def show_preview(mpo_path):
     canvas.image = photo
     image_container = canvas.create_image(0, 0, anchor=tk.NW, image=photo)
 
+    # PhotoImages are only rebuilt when the input thread has replaced left_img/right_img
+    photos = {"source": None, "images": None}
+
     def update():
         global toggle
         if stop_preview:
             window.destroy()
             return
-        img = left_img if toggle else right_img
-        photo = ImageTk.PhotoImage(img)
+        with state_lock:
+            source = (left_img, right_img)
+            interval = preview_interval
+        if photos["source"] is None or photos["source"][0] is not source[0] or photos["source"][1] is not source[1]:
+            photos["source"] = source
+            photos["images"] = (ImageTk.PhotoImage(source[0]), ImageTk.PhotoImage(source[1]))
+        photo = photos["images"][0] if toggle else photos["images"][1]
         canvas.image = photo
         canvas.itemconfig(image_container, image=photo)
         toggle = not toggle
-        window.after(int(preview_interval * 1000), update)
+        window.after(int(interval * 1000), update)
 
     window.after(int(preview_interval * 1000), update)
     window.mainloop()
@@ -112,25 +141,32 @@ def handle_input(mpo_path):
             stop_preview = True
             if not os.path.exists(output_folder):
                 os.makedirs(output_folder)
-            left_img.save(os.path.join(output_folder, f"{base_filename}_left.jpg"))
-            right_img.save(os.path.join(output_folder, f"{base_filename}_right.jpg"))
+            with state_lock:
+                left, right, duration = left_img, right_img, frame_duration
+            left.save(os.path.join(output_folder, f"{base_filename}_left.jpg"))
+            right.save(os.path.join(output_folder, f"{base_filename}_right.jpg"))
             gif_path = os.path.join(output_folder, f"{base_filename}.gif")
-            create_gif([left_img, right_img], gif_path, frame_duration)
+            create_gif([left, right], gif_path, duration)
             print(f"✅ Exported {base_filename}. Moving to next MPO...\n")
             break
 
         elif cmd.lower().startswith("o"):
             try:
-                overlap = int(cmd[1:])
-                left_img, right_img = process_images(mpo_path, overlap)
+                value = int(cmd[1:])
+                images = process_images(mpo_path, value, dict(crop))
+                with state_lock:
+                    overlap = value
+                    left_img, right_img = images
                 print(f"🔁 Updated overlap to {overlap}")
             except:
                 print("⚠️ Invalid overlap. Use format: o<number>")
 
         elif cmd.lower().startswith("f"):
             try:
-                frame_duration = int(cmd[1:])
-                preview_interval = frame_duration / 1000.0
+                value = int(cmd[1:])
+                with state_lock:
+                    frame_duration = value
+                    preview_interval = frame_duration / 1000.0
                 print(f"⏱️ Updated frame duration to {frame_duration}ms")
             except:
                 print("⚠️ Invalid frame duration. Use format: f<number>")
@@ -141,8 +177,11 @@ def handle_input(mpo_path):
                 side = parts[1][0]
                 value = int(parts[1][1:])
                 if side in crop:
-                    crop[side] = value
-                    left_img, right_img = process_images(mpo_path, overlap)
+                    new_crop = {**crop, side: value}
+                    images = process_images(mpo_path, overlap, new_crop)
+                    with state_lock:
+                        crop = new_crop
+                        left_img, right_img = images
                     print(f"✂️ Cropped {side.upper()} side by {value}px")
                 else:
                     raise ValueError
@@ -154,12 +193,9 @@ def handle_input(mpo_path):
 
 # === MAIN LOOP ===
 if __name__ == "__main__":
-    mpo_files = sorted([f for f in os.listdir(input_folder) if f.lower().endswith(".mpo")])
-    print(f"📂 Found {len(mpo_files)} MPO files.")
-
     counter = 1
 
-    for mpo_file in mpo_files:
+    for mpo_file in scan_mpo_files(input_folder):
         if exit_script:
             break
 
@@ -173,12 +209,12 @@ if __name__ == "__main__":
         print(f"\n🔍 Editing: {mpo_file} → Saving as {base_filename}")
 
         # Reset settings
-        overlap = 0
-        frame_duration = 175
-        preview_interval = 0.05
-        crop = {"l": 0, "t": 0, "r": 0, "b": 0}
+        with state_lock:
+            overlap = 0
+            frame_duration = 175
+            preview_interval = 0.05
+            crop = {"l": 0, "t": 0, "r": 0, "b": 0}
 
-        import threading
         input_thread = threading.Thread(target=handle_input, args=(mpo_path,), daemon=True)
         input_thread.start()
         show_preview(mpo_path)
@@ -0,0 +1,86 @@
+# Start-up budget check: how long `import mpo_to_gif` takes in a fresh
+# interpreter, and which heavy modules it pulls in.
+#
+# Usage: python benchmarks/bench_imports.py [--budget-ms 250] [--runs 5]
+#
+# numpy, moviepy and Tk must only be imported once they are used, so the
+# splash screen comes up quickly and GIF-only batch runs never load the video
+# stack. Exits with status 1 when the import is over budget or a heavy module
+# was loaded too early, so it can gate a release build.
+import argparse
+import json
+import os
+import py_compile
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["numpy", "moviepy", "imageio", "tkinter", "PIL.ImageTk", "multiprocessing"]
+
+# Each probe runs in its own interpreter and prints the heavy modules loaded at the end
+IMPORT_PROBE = "import mpo_to_gif"
+GIF_PROBE = """
+import os, tempfile
+import mpo_to_gif
+from PIL import Image
+with tempfile.TemporaryDirectory() as folder:
+    frames = [Image.new("RGB", (64, 48), "red"), Image.new("RGB", (64, 48), "blue")]
+    mpo_to_gif.export_images(*frames, folder, "probe", 175, formats=["jpg", "gif"])
+"""
+REPORT = """
+import json, sys
+print(json.dumps([name for name in {modules!r} if name in sys.modules]))
+"""
+
+
+def run_probe(code, import_time=False):
+    # Returns the heavy modules that were loaded and, with import_time, the microseconds `import mpo_to_gif` took
+    command = [sys.executable]
+    if import_time:
+        command += ["-X", "importtime"]
+    command += ["-c", code + REPORT.format(modules=HEAVY_MODULES)]
+    result = subprocess.run(command, cwd=ROOT, capture_output=True, text=True, check=True)
+
+    micros = None
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and line.rstrip().endswith("| mpo_to_gif"):
+            micros = int(line.split("|")[1])
+    return json.loads(result.stdout.splitlines()[-1]), micros
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the import time and lazy imports of mpo_to_gif")
+    parser.add_argument("--budget-ms", type=float, default=250, help="allowed median import time (default: 250)")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters to time (default: 5)")
+    args = parser.parse_args()
+
+    # Time the import as users get it, with the bytecode already cached
+    py_compile.compile(os.path.join(ROOT, "mpo_to_gif.py"), doraise=True)
+
+    samples = []
+    loaded = []
+    for _ in range(args.runs):
+        loaded, micros = run_probe(IMPORT_PROBE, import_time=True)
+        samples.append(micros / 1000)
+    gif_loaded, _ = run_probe(GIF_PROBE)
+
+    median = statistics.median(samples)
+    print(f"import mpo_to_gif: median {median:.1f} ms, min {min(samples):.1f} ms (budget {args.budget_ms:.0f} ms)")
+    print(f"loaded by the import: {', '.join(loaded) or 'none'}")
+    print(f"loaded by a JPG + GIF export: {', '.join(gif_loaded) or 'none'}")
+
+    problems = []
+    if median > args.budget_ms:
+        problems.append(f"import takes {median:.1f} ms, over the {args.budget_ms:.0f} ms budget")
+    if loaded:
+        problems.append(f"import loads {', '.join(loaded)}")
+    if set(gif_loaded) - {"numpy"}:
+        problems.append(f"GIF export loads {', '.join(set(gif_loaded) - {'numpy'})}")
+    for problem in problems:
+        print(f"❌ {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
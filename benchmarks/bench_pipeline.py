@@ -0,0 +1,217 @@
+# Benchmark of the decode -> crop/shift -> encode pipeline on synthetic MPO files.
+#
+# Usage: python benchmarks/bench_pipeline.py [--sizes 640x480,2048x1536] [--files 8] [--output results.json]
+#
+# Every stage is timed on its own so a change to one of them shows up in its
+# own numbers. Results are printed as a table and written as JSON, keep the
+# JSON of a release around to compare later versions against it.
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import PIL
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import mpo_to_gif
+
+STAGES = ["decode", "crop", "jpeg", "jpeg_passthrough", "gif", "mp4", "total"]
+OVERLAP = 12
+CROP = {"l": 8, "t": 4, "r": 8, "b": 4}
+DURATION = 175
+
+
+def make_synthetic_mpo(path, width, height, seed):
+    # Smooth shapes with some noise compress roughly like real photos, pure noise would not
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    channels = []
+    for _ in range(3):
+        fx, fy, phase = rng.uniform(2, 12), rng.uniform(2, 12), rng.uniform(0, np.pi)
+        channels.append(127 + 100 * np.sin(x / width * fx + phase) * np.cos(y / height * fy))
+    pixels = np.stack(channels, axis=-1) + rng.normal(0, 6, (height, width, 3))
+    scene = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+    # The right eye sees the scene shifted sideways
+    shift = max(2, width // 80)
+    left = scene
+    right = Image.new("RGB", scene.size)
+    right.paste(scene.crop((shift, 0, width, height)), (0, 0))
+    left.save(path, "MPO", save_all=True, append_images=[right], quality=90)
+
+
+def timed(timings, stage, func, *args, **kwargs):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func(*args, **kwargs)
+    timings[stage].append(time.perf_counter() - start)
+    return result
+
+
+def run_size(width, height, files, mp4, work_dir):
+    paths = []
+    for i in range(files):
+        path = os.path.join(work_dir, f"bench_{width}x{height}_{i:03d}.mpo")
+        make_synthetic_mpo(path, width, height, seed=i)
+        paths.append(path)
+
+    timings = {stage: [] for stage in STAGES}
+    out_dir = os.path.join(work_dir, "out")
+    os.makedirs(out_dir, exist_ok=True)
+
+    for path in paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+        start = time.perf_counter()
+
+        frames = timed(timings, "decode", mpo_to_gif.decode_frames, path)
+
+        # Time the crop on frames that are already decoded, like a slider edit does
+        mpo_to_gif.frame_cache.clear()
+        mpo_to_gif.frame_cache.put(path, frames)
+        left, right = timed(timings, "crop", mpo_to_gif.process_images, path, OVERLAP, CROP)
+
+        timed(timings, "jpeg", mpo_to_gif.save_eye_jpegs, path, left, right,
+              os.path.join(out_dir, f"{name}_left.jpg"), os.path.join(out_dir, f"{name}_right.jpg"))
+
+        timed(timings, "jpeg_passthrough", mpo_to_gif.copy_eye_jpegs, path,
+              os.path.join(out_dir, f"{name}_raw_left.jpg"), os.path.join(out_dir, f"{name}_raw_right.jpg"))
+
+        timed(timings, "gif", mpo_to_gif.create_gif, [left, right], os.path.join(out_dir, f"{name}.gif"), DURATION)
+
+        if mp4:
+            timed(timings, "mp4", mpo_to_gif.create_mp4, [left, right], os.path.join(out_dir, f"{name}.mp4"), DURATION)
+
+        timings["total"].append(time.perf_counter() - start)
+
+    mpo_to_gif.frame_cache.clear()
+
+    # The peak RSS of this process only ever goes up, so every stage is measured again in a fresh one
+    peaks = {stage: measure_stage_memory(stage, paths[0], out_dir)
+             for stage in STAGES if stage != "total" and (mp4 or stage != "mp4")}
+    peaks["total"] = {"peak_rss_mb": mpo_to_gif.peak_memory_mb(), "stage_rss_mb": None}
+
+    results = []
+    for stage in STAGES:
+        samples = timings[stage]
+        if not samples:
+            continue
+        ordered = sorted(samples)
+        results.append({
+            "size": f"{width}x{height}",
+            "stage": stage,
+            "files": len(samples),
+            "mean_ms": round(statistics.mean(samples) * 1000, 2),
+            "median_ms": round(statistics.median(samples) * 1000, 2),
+            "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+            "files_per_sec": round(len(samples) / sum(samples), 2),
+            **peaks[stage],
+        })
+    return results
+
+
+def process_peak_mb():
+    # Linux keeps ru_maxrss across exec, so a fresh process would start at the peak of this one.
+    # VmHWM belongs to the new process only.
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return mpo_to_gif.peak_memory_mb()
+
+
+def probe_stage_memory(stage, path, out_dir):
+    # Runs in a fresh process: first does what the stage needs untimed, then reports the peak RSS
+    # before and after the stage. The difference is how much memory the stage itself needed.
+    name = os.path.splitext(os.path.basename(path))[0]
+    with contextlib.redirect_stdout(io.StringIO()):
+        if stage not in ("decode", "jpeg_passthrough"):
+            mpo_to_gif.frame_cache.get(path)
+        if stage in ("jpeg", "gif", "mp4"):
+            left, right = mpo_to_gif.process_images(path, OVERLAP, CROP)
+        before = process_peak_mb()
+
+        if stage == "decode":
+            mpo_to_gif.decode_frames(path)
+        elif stage == "crop":
+            mpo_to_gif.process_images(path, OVERLAP, CROP)
+        elif stage == "jpeg":
+            mpo_to_gif.save_eye_jpegs(path, left, right, os.path.join(out_dir, f"{name}_mem_left.jpg"),
+                                      os.path.join(out_dir, f"{name}_mem_right.jpg"))
+        elif stage == "jpeg_passthrough":
+            mpo_to_gif.copy_eye_jpegs(path, os.path.join(out_dir, f"{name}_mem_raw_left.jpg"),
+                                      os.path.join(out_dir, f"{name}_mem_raw_right.jpg"))
+        elif stage == "gif":
+            mpo_to_gif.create_gif([left, right], os.path.join(out_dir, f"{name}_mem.gif"), DURATION)
+        elif stage == "mp4":
+            mpo_to_gif.create_mp4([left, right], os.path.join(out_dir, f"{name}_mem.mp4"), DURATION)
+    print(json.dumps({"before": before, "after": process_peak_mb()}))
+
+
+def measure_stage_memory(stage, path, out_dir):
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), "--probe-memory", stage, path, out_dir],
+                            check=True, capture_output=True, text=True).stdout
+    probe = json.loads(output.splitlines()[-1])
+    return {"peak_rss_mb": probe["after"], "stage_rss_mb": round(probe["after"] - probe["before"], 1)}
+
+
+def parse_size(text):
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the MPO to GIF pipeline on synthetic files")
+    parser.add_argument("--sizes", default="640x480,2048x1536",
+                        help="comma separated frame sizes, 640x480 is the 3DS resolution (default: 640x480,2048x1536)")
+    parser.add_argument("--files", type=int, default=8, help="synthetic files per size (default: 8)")
+    parser.add_argument("--no-mp4", action="store_true", help="leave out the MP4 encode, e.g. without ffmpeg")
+    parser.add_argument("--output", help="write the JSON results to this file instead of stdout")
+    parser.add_argument("--probe-memory", nargs=3, metavar=("STAGE", "PATH", "OUT_DIR"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.probe_memory:
+        probe_stage_memory(*args.probe_memory)
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for size in args.sizes.split(","):
+            width, height = parse_size(size)
+            results.extend(run_size(width, height, args.files, not args.no_mp4, work_dir))
+
+    print(f"{'size':>10} {'stage':>17} {'median ms':>10} {'p95 ms':>8} {'files/s':>8} {'peak MB':>8} {'stage MB':>8}", file=sys.stderr)
+    for row in results:
+        print(f"{row['size']:>10} {row['stage']:>17} {row['median_ms']:>10} {row['p95_ms']:>8} "
+              f"{row['files_per_sec']:>8} {row['peak_rss_mb']!s:>8} {row['stage_rss_mb']!s:>8}", file=sys.stderr)
+
+    report = {
+        "version": mpo_to_gif.VERSION,
+        "python": platform.python_version(),
+        "pillow": PIL.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
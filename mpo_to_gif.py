@@ -1,14 +1,74 @@
+import argparse
+import copy
+import csv
+import hashlib
+import io
+import json
+import math
+import mmap
 import os
-import tempfile
-import tkinter as tk
-from tkinter import ttk
-from PIL import Image, ImageSequence, ImageTk
-from tkinter import filedialog
-from moviepy.video.io.ImageSequenceClip import ImageSequenceClip
-os.environ["IMAGEIO_FFMPEG_EXE"] = "ffmpeg.exe"
+import queue
+import struct
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict, deque, namedtuple
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageOps, JpegImagePlugin, features
+if os.name == "nt":
+    os.environ.setdefault("IMAGEIO_FFMPEG_EXE", "ffmpeg.exe")
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
 
 VERSION = "0.1.0"
 
+# === LAZY IMPORTS ===
+# numpy, Tk, moviepy (imported in create_mp4) and multiprocessing (imported in
+# run_batch) make up most of the start-up time, and many runs never use some of
+# them: batch runs have no GUI, GIF-only runs never touch moviepy. These
+# stand-ins import the real module on first use and then replace themselves
+# with it. The imports are spelled out in functions so PyInstaller finds them.
+class LazyModule:
+    def __init__(self, name, load):
+        self._name = name
+        self._load = load
+
+    def __getattr__(self, attr):
+        module = self._load()
+        globals()[self._name] = module
+        return getattr(module, attr)
+
+def import_numpy():
+    import numpy
+    return numpy
+
+def import_tkinter():
+    import tkinter
+    return tkinter
+
+def import_ttk():
+    from tkinter import ttk
+    return ttk
+
+def import_filedialog():
+    from tkinter import filedialog
+    return filedialog
+
+def import_imagetk():
+    from PIL import ImageTk
+    return ImageTk
+
+np = LazyModule("np", import_numpy)
+tk = LazyModule("tk", import_tkinter)
+ttk = LazyModule("ttk", import_ttk)
+filedialog = LazyModule("filedialog", import_filedialog)
+ImageTk = LazyModule("ImageTk", import_imagetk)
+
 # === SPLASH SCREEN ===
 def launch_splash(on_submit):
     splash = tk.Tk()
@@ -68,13 +128,27 @@ def launch_splash(on_submit):
 
 def start_main_app(input_path, output_path):
     global input_folder, output_folder, mpo_files, window, canvas, image_container, status_label, skip_entry
+    global render_scheduler, prefetcher, export_queue, edit_index, slider_widgets, file_scan, thumbnail_cache
 
 
     input_folder = input_path
     output_folder = output_path
 
-    mpo_files = sorted([f for f in os.listdir(input_folder) if f.lower().endswith(".mpo")])
-    current_index = 0
+    file_scan = FileScan(input_folder, output_folder)
+    mpo_files = file_scan.files  # Keeps growing while the scan runs
+
+    # Resume after the files that were exported or skipped in an earlier session
+    edit_index = EditIndex(output_folder)
+    start_index = 0
+    while file_scan.wait_for(start_index + 1) and edit_index.is_done(
+            mpo_files[start_index], os.path.join(input_folder, mpo_files[start_index])):
+        start_index += 1
+    if start_index == len(mpo_files):
+        # Nothing to edit, don't open the editor (load_file would close it right away)
+        print(f"✅ All {len(mpo_files)} files are already exported or skipped.")
+        return
+    if start_index:
+        print(f"⏩ Resuming at {start_index + 1} of {len(mpo_files)}, earlier files are done.")
 
     # === GUI SETUP ===
     window = tk.Tk()
@@ -98,6 +172,7 @@ def start_main_app(input_path, output_path):
             skip_entry.focus_set()
 
     window.bind("<Key>", handle_key)
+    window.protocol("WM_DELETE_WINDOW", exit_script)
 
     # === APPLY COLORS TO WINDOW AND WIDGETS ===
     window.configure(bg=colors["bg_main"])
@@ -179,12 +254,13 @@ def start_main_app(input_path, output_path):
     slider_grid = {"row": 0, "col": 0}
 
     # === SLIDERS ===
-    create_slider("Overlap", -100, 100, update_overlap, overlap)
+    crop = session.crop_box
+    create_slider("Overlap", -100, 100, update_overlap, session.overlap)
     create_slider("Crop Left", 0, 200, update_crop, crop["l"], "l")
     create_slider("Crop Top", 0, 200, update_crop, crop["t"], "t")
     create_slider("Crop Right", 0, 200, update_crop, crop["r"], "r")
     create_slider("Crop Bottom", 0, 200, update_crop, crop["b"], "b")
-    create_slider("Frame Duration (ms)", 50, 1000, update_duration, frame_duration)
+    create_slider("Frame Duration (ms)", 50, 1000, update_duration, session.duration)
 
     # === BUTTONS ===
     def add_button(text, command):
@@ -205,19 +281,8 @@ def start_main_app(input_path, output_path):
             slider_grid["row"] += 1
 
     def reset_defaults():
-        global overlap, frame_duration, crop, preview_interval
-        overlap = 0
-        frame_duration = 175
-        preview_interval = frame_duration / 1000.0
-        crop = {"l": 0, "t": 0, "r": 0, "b": 0}
-
-        # Reset sliders visually
-        slider_widgets["Overlap"].set(overlap)
-        slider_widgets["Crop Left"].set(crop["l"])
-        slider_widgets["Crop Top"].set(crop["t"])
-        slider_widgets["Crop Right"].set(crop["r"])
-        slider_widgets["Crop Bottom"].set(crop["b"])
-        slider_widgets["Frame Duration (ms)"].set(frame_duration)
+        session.reset()
+        update_sliders()  # Reset sliders visually
 
     add_button("Export", export_current)
     add_button("Skip", skip_current)
@@ -232,29 +297,111 @@ def start_main_app(input_path, output_path):
 
     slider_grid["row"] += 1
     slider_grid["col"] = 0
+    def auto_align(region=None):
+        value = auto_overlap(session.mpo_path, region, session.scale)
+        print(f"🎯 Auto aligned overlap to {value}")
+        slider_widgets["Overlap"].set(value)
+
+    def align_on_click(event):
+        # Shift+click lines the eyes up on the clicked spot, using a region around it in left frame pixels.
+        # A plain click would be too easy to do by accident, it replaces the overlap that was set by hand.
+        left, _, scale = session.frames()
+        spec = session.spec()
+        full_width, full_height = left.width * scale, left.height * scale
+        x = (event.x * scale) - spec.overlap + spec.crop[0]
+        y = (event.y * scale) + spec.crop[1]
+        half_w, half_h = full_width // 8, full_height // 8
+        auto_align((x - half_w, y - half_h, x + half_w, y + half_h))
+
+    canvas.bind("<Shift-Button-1>", align_on_click)
+
     add_button("Go", skip_ahead)
     add_button("Exit", exit_script)
     add_button("Reset", reset_defaults)
+    add_button("Auto Align", auto_align)
+    add_button("Browse", toggle_browser)
+
+    # === OUTPUT FORMATS ===
+    if slider_grid["col"] == 1:
+        slider_grid["col"] = 0
+        slider_grid["row"] += 1
+    formats_frame = tk.Frame(grid_frame, bg=colors["bg_controls"])
+    formats_frame.grid(row=slider_grid["row"], column=0, columnspan=2, padx=10, pady=5, sticky="w")
+
+    def toggle_format(name, var):
+        if var.get():
+            output_formats.append(name)
+        elif len(output_formats) > 1:
+            output_formats.remove(name)
+        else:
+            var.set(True)  # At least one format has to stay selected
+
+    for position, name in enumerate(OUTPUT_WRITERS):
+        var = tk.BooleanVar(value=name in output_formats)
+        tk.Checkbutton(
+            formats_frame,
+            text=name.upper(),
+            variable=var,
+            command=lambda name=name, var=var: toggle_format(name, var),
+            bg=colors["bg_controls"],
+            fg=colors["fg_label"],
+            activebackground=colors["bg_controls"],
+            selectcolor=colors["bg_entry"],
+            highlightthickness=0
+        ).grid(row=position // 6, column=position % 6, padx=(0, 8), sticky="w")
 
     pass
 
-    load_file(current_index)
+    render_scheduler = RenderScheduler(render, apply_render)
+    prefetcher = Prefetcher(frame_cache, prefetch_mb * 1024 * 1024)
+    export_queue = ExportQueue(export_workers, export_queue_size)
+    thumbnail_cache = ThumbnailCache(output_folder, thumb_size, thumb_workers)
+
+    load_file(start_index)
     update_preview()
+    poll_renders()
+    poll_exports()
     window.mainloop()
 
 # === GLOBAL STATE ===
-overlap = 0
-frame_duration = 175
-preview_interval = 0.05
-crop = {"l": 0, "t": 0, "r": 0, "b": 0}
 toggle = True
-left_img = None
-right_img = None
 window = None
 canvas = None
 image_container = None
 photo = None
-base_filename = ""
+preview_photos = None  # (left, right) PhotoImages, rebuilt only when the images change
+render_scheduler = None
+render_poll_interval = 15  # ms between checks for finished background renders
+prefetcher = None
+prefetch_count = 3  # Number of upcoming files decoded ahead of time
+prefetch_mb = 64  # Stop decoding ahead once this much has been prefetched for the current file
+export_queue = None
+edit_index = None
+file_scan = None
+slider_widgets = {}
+export_workers = 2  # Files written in the background at the same time
+export_queue_size = 4  # Export waits for a free spot once this many files are queued
+export_poll_interval = 200  # ms between export progress updates in the status bar
+mp4_preset = "medium"  # x264 preset, faster presets encode quicker at the cost of file size
+mp4_crf = None  # x264 constant rate factor, None keeps the encoder default
+gif_quantizer = "mediancut"  # See GIF_QUANTIZERS
+gif_dither = "none"  # See GIF_DITHERS, dithering makes the GIF a lot larger
+gif_scale = 1.0  # Resize factor applied to GIF frames only, e.g. 0.5 for half size
+output_formats = ["jpg", "gif", "mp4"]  # See OUTPUT_WRITERS
+writer_options = {}  # Format -> option overrides, see OUTPUT_WRITERS
+wiggle_steps = 0  # Views rendered between the eyes in animated outputs, 0 just flips between them
+wiggle_method = "warp"  # See WIGGLE_METHODS
+frame_cache_mb = 256  # Memory budget for decoded MPO frames kept between slider edits
+batch_frame_cache_mb = 128  # Same, for each batch worker process
+preview_max_width = 640  # Larger photos are decoded at 1/2, 1/4 or 1/8 scale for the live preview
+thumbnail_cache = None
+thumbnail_browser = None
+thumb_size = 120  # Longest side of a browser thumbnail in pixels
+thumb_columns = 4
+thumb_workers = 2  # Threads generating thumbnails, decoding releases the GIL
+compilation_mode = "chapters"  # See COMPILATION_MODES
+compilation_loops = 4  # Flickers per file in a batch compilation
+batch_keep_frames = False  # Batch workers send the rendered frames back for the compilation
 
 # === COLOR PALETTE ===
 colors = {
@@ -279,136 +426,1881 @@ colors = {
     "fg_box": "#ffffff",         # white for bounding box text (if any)
 }
 
-# === IMAGE PROCESSING ===
-def process_images(mpo_path, overlap):
-    mpo = Image.open(mpo_path)
-    frames = [frame.copy() for frame in ImageSequence.Iterator(mpo)]
-    if len(frames) < 2:
-        raise ValueError("MPO file must contain at least two frames.")
-
-    width, height = frames[0].size
-    left_start = -overlap
-    right_start = overlap
+# === INSTRUMENTATION ===
+# Every pipeline stage is timed into stats: how often it ran, how long it took
+# (total, min, max and a histogram) and the highest memory use seen so far.
+# The editor shows the latest timings in the status bar, and a report can be
+# written as JSON or CSV at the end of a run.
+STAGE_HISTOGRAM_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)  # Upper bucket bounds
+REPORT_NAME = "mpo_to_gif_report.json"  # Stage timings of the last editor session
+
+def peak_memory_mb():
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS bytes
+        return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+    if os.name == "nt":
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return round(counters.PeakWorkingSetSize / (1024 * 1024), 1)
+    return None
+
+class StageStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages = {}  # name -> {"count", "total_ms", "min_ms", "max_ms", "last_ms", "histogram"}
+        self.peak_memory_mb = None
+
+    @contextmanager
+    def measure(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, (time.perf_counter() - start) * 1000)
+
+    def add(self, stage, ms):
+        bucket = next((i for i, bound in enumerate(STAGE_HISTOGRAM_MS) if ms <= bound), len(STAGE_HISTOGRAM_MS))
+        peak = peak_memory_mb()
+        with self._lock:
+            entry = self.stages.setdefault(stage, {
+                "count": 0, "total_ms": 0.0, "min_ms": ms, "max_ms": ms, "last_ms": ms,
+                "histogram": [0] * (len(STAGE_HISTOGRAM_MS) + 1),
+            })
+            entry["count"] += 1
+            entry["total_ms"] += ms
+            entry["min_ms"] = min(entry["min_ms"], ms)
+            entry["max_ms"] = max(entry["max_ms"], ms)
+            entry["last_ms"] = ms
+            entry["histogram"][bucket] += 1
+            if peak is not None:
+                self.peak_memory_mb = max(self.peak_memory_mb or 0, peak)
+
+    def drain(self):
+        # Hand over everything measured so far and start again, used to collect stats from worker processes
+        with self._lock:
+            data = {"stages": self.stages, "peak_memory_mb": self.peak_memory_mb}
+            self.stages = {}
+        return data
+
+    def merge(self, data):
+        with self._lock:
+            for stage, other in data["stages"].items():
+                entry = self.stages.get(stage)
+                if entry is None:
+                    self.stages[stage] = dict(other, histogram=list(other["histogram"]))
+                    continue
+                entry["count"] += other["count"]
+                entry["total_ms"] += other["total_ms"]
+                entry["min_ms"] = min(entry["min_ms"], other["min_ms"])
+                entry["max_ms"] = max(entry["max_ms"], other["max_ms"])
+                entry["last_ms"] = other["last_ms"]
+                entry["histogram"] = [a + b for a, b in zip(entry["histogram"], other["histogram"])]
+            # Every process has its own peak, keep the highest one
+            if data["peak_memory_mb"] is not None:
+                self.peak_memory_mb = max(self.peak_memory_mb or 0, data["peak_memory_mb"])
+
+    def summary(self):
+        with self._lock:
+            parts = [f"{stage} {entry['last_ms']:.0f} ms" for stage, entry in self.stages.items()]
+            if self.peak_memory_mb is not None:
+                parts.append(f"peak {self.peak_memory_mb:.0f} MB")
+        return "  ·  ".join(parts)
+
+    def rows(self):
+        with self._lock:
+            return [{
+                "stage": stage,
+                "count": entry["count"],
+                "total_ms": round(entry["total_ms"], 2),
+                "mean_ms": round(entry["total_ms"] / entry["count"], 2),
+                "min_ms": round(entry["min_ms"], 2),
+                "max_ms": round(entry["max_ms"], 2),
+                "histogram": dict(zip([f"<={bound}ms" for bound in STAGE_HISTOGRAM_MS] + ["slower"],
+                                      entry["histogram"])),
+            } for stage, entry in self.stages.items()]
+
+    def write_report(self, path):
+        rows = self.rows()
+        if path.lower().endswith(".csv"):
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                buckets = list(rows[0]["histogram"]) if rows else []
+                writer = csv.writer(f)
+                writer.writerow(["stage", "count", "total_ms", "mean_ms", "min_ms", "max_ms", *buckets])
+                for row in rows:
+                    writer.writerow([row["stage"], row["count"], row["total_ms"], row["mean_ms"],
+                                     row["min_ms"], row["max_ms"], *row["histogram"].values()])
+                writer.writerow(["peak_memory_mb", self.peak_memory_mb])
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"version": VERSION, "peak_memory_mb": self.peak_memory_mb, "stages": rows}, f, indent=2)
+        print(f"📊 Report saved to: {path}")
+
+stats = StageStats()
+
+# === DIRECTORY SCAN ===
+# SD card dumps are DCIM/1xxNIN03 folder trees with the MPO files next to
+# .JPG copies of the left eye, only the MPO files are picked up. Files are
+# yielded folder by folder in sorted order, so the first photo can be opened
+# while the rest of the tree is still being scanned. The listing of every
+# folder is remembered in the output folder and reused on the next run for
+# folders that haven't changed since.
+SCAN_CACHE_NAME = "mpo_to_gif_scan.json"
+
+def scan_mpo_files(root, cache=None):
+    # Yields paths relative to root with "/" separators. cache maps those relative
+    # folder paths to their last listing and is updated in place.
+    stack = [""]
+    while stack:
+        relative = stack.pop()
+        folder = os.path.join(root, relative) if relative else root
+        try:
+            mtime = os.stat(folder).st_mtime_ns
+        except OSError as e:
+            print(f"⚠️ Cannot read {folder}: {e}")
+            continue
+
+        listing = cache.get(relative) if cache is not None else None
+        if not listing or listing["mtime_ns"] != mtime:
+            files, folders = [], []
+            try:
+                with os.scandir(folder) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            folders.append(entry.name)
+                        elif entry.name.lower().endswith(".mpo"):
+                            files.append(entry.name)
+            except OSError as e:
+                print(f"⚠️ Cannot read {folder}: {e}")
+                continue
+            listing = {"mtime_ns": mtime, "files": sorted(files), "folders": sorted(folders)}
+            if cache is not None:
+                cache[relative] = listing
+
+        prefix = relative + "/" if relative else ""
+        for name in listing["files"]:
+            yield prefix + name
+        stack.extend(prefix + name for name in reversed(listing["folders"]))
+
+def load_scan_cache(folder, root):
+    try:
+        with open(os.path.join(folder, SCAN_CACHE_NAME), encoding="utf-8") as f:
+            data = json.load(f)
+        if data["root"] == os.path.abspath(root):
+            return data["folders"]
+    except (OSError, ValueError, KeyError):
+        pass
+    return {}
+
+def save_scan_cache(folder, root, cache):
+    try:
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, SCAN_CACHE_NAME)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"root": os.path.abspath(root), "folders": cache}, f)
+        os.replace(path + ".tmp", path)
+    except OSError as e:
+        print(f"⚠️ Could not save the folder listing: {e}")
+
+def output_name(mpo_file):
+    # Files in subfolders keep the folder in their name, 3DS dumps reuse file names across folders
+    return os.path.splitext(mpo_file)[0].replace("/", "_")
+
+class FileScan:
+    # Runs scan_mpo_files on a background thread, the editor reads files as they come in
+    def __init__(self, root, cache_folder):
+        self.files = []
+        self.done = threading.Event()
+        self._root = root
+        self._cache_folder = cache_folder
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def wait_for(self, count):
+        # Returns once at least count files were found or the scan is over
+        while len(self.files) < count and not self.done.wait(0.02):
+            pass
+        return len(self.files) >= count
+
+    def _run(self):
+        cache = load_scan_cache(self._cache_folder, self._root)
+        try:
+            for mpo_file in scan_mpo_files(self._root, cache):
+                self.files.append(mpo_file)
+            save_scan_cache(self._cache_folder, self._root, cache)
+        finally:
+            self.done.set()
+        print(f"📂 Found {len(self.files)} MPO files.")
+
+# === MPO READER ===
+# Reads the structure of an MPO straight from a memory map of the file: the MP
+# Index in the APP2 segment of the first image (where every image starts and
+# ends), the MP Attributes (stereo metadata) and the parallax the 3DS recorded
+# in its maker note. Nothing is decoded, the eyes are handed out as views into
+# the mapped file and only become pixels when open_eye() is used.
+TIFF_TYPE_FORMATS = {1: "B", 2: "s", 3: "H", 4: "L", 5: "LL", 7: "s", 9: "l", 10: "ll", 11: "f", 12: "d"}
+MP_ATTRIBUTE_TAGS = {
+    0xB101: "individual_number",
+    0xB201: "pan_orientation",
+    0xB202: "pan_overlap_h",
+    0xB203: "pan_overlap_v",
+    0xB204: "base_viewpoint",
+    0xB205: "convergence_angle",
+    0xB206: "baseline_length",
+    0xB207: "vertical_divergence",
+    0xB208: "axis_distance_x",
+    0xB209: "axis_distance_y",
+    0xB20A: "axis_distance_z",
+    0xB20B: "yaw_angle",
+    0xB20C: "pitch_angle",
+    0xB20D: "roll_angle",
+}
+NINTENDO_CAMERA_INFO = 0x1101  # Maker note tag, the parallax is a float at offset 0x28 of its data
+NINTENDO_PARALLAX_OFFSET = 0x28
+
+def find_segment(data, marker, signature, start=0):
+    # Walk the JPEG markers starting at the SOI at start up to the segment with this marker and signature.
+    # Returns the start and end of the segment and where its content (after the signature) begins.
+    pos = start + 2  # Skip SOI
+    while pos + 4 <= len(data):
+        found, length = struct.unpack(">HH", data[pos:pos + 4])
+        if found == 0xFFDA or found >> 8 != 0xFF:
+            break  # Start of scan (or garbage), no more metadata segments
+        if found == marker and data[pos + 4:pos + 4 + len(signature)] == signature:
+            return pos, pos + 2 + length, pos + 4 + len(signature)
+        pos += 2 + length
+    return None
+
+def find_mp_segment(data):
+    # Returns the start and end of the APP2 segment holding the MP Index, and the
+    # offset its MP Entry offsets are relative to
+    segment = find_segment(data, 0xFFE2, b"MPF\0")
+    if segment is None:
+        raise ValueError("MPO file has no MP Index.")
+    return segment
+
+def ifd_entries(data, tiff_start, ifd_offset, order):
+    # Yields tag, type, count and the file position of the value for every entry of a TIFF IFD
+    pos = tiff_start + ifd_offset
+    (count,) = struct.unpack_from(order + "H", data, pos)
+    for entry_pos in range(pos + 2, pos + 2 + count * 12, 12):
+        tag, kind, n = struct.unpack_from(order + "HHL", data, entry_pos)
+        fmt = TIFF_TYPE_FORMATS.get(kind)
+        if fmt is None:
+            continue
+        value_pos = entry_pos + 8
+        if struct.calcsize(order + fmt) * n > 4:
+            (value_pos,) = struct.unpack_from(order + "L", data, value_pos)
+            value_pos += tiff_start
+        yield tag, kind, n, value_pos
+
+def read_ifd(data, tiff_start, ifd_offset, order):
+    # Returns {tag: value} of one TIFF IFD and the offset of the next one (0 for none)
+    tags = {}
+    for tag, kind, n, value_pos in ifd_entries(data, tiff_start, ifd_offset, order):
+        if kind in (2, 7):
+            tags[tag] = data[value_pos:value_pos + n]
+            continue
+        values = struct.unpack_from(order + TIFF_TYPE_FORMATS[kind] * n, data, value_pos)
+        if kind in (5, 10):
+            values = tuple(a / b if b else 0.0 for a, b in zip(values[::2], values[1::2]))
+        tags[tag] = values[0] if n == 1 else values
+    (count,) = struct.unpack_from(order + "H", data, tiff_start + ifd_offset)
+    (next_ifd,) = struct.unpack_from(order + "L", data, tiff_start + ifd_offset + 2 + count * 12)
+    return tags, next_ifd
+
+def tiff_byte_order(data, tiff_start):
+    order = {b"II": "<", b"MM": ">"}.get(data[tiff_start:tiff_start + 2])
+    if order is None:
+        raise ValueError("Broken TIFF header in MPO metadata.")
+    (first_ifd,) = struct.unpack_from(order + "L", data, tiff_start + 4)
+    return order, first_ifd
+
+class MPOReader:
+    def __init__(self, mpo_path):
+        with open(mpo_path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._parse()
+        except (ValueError, struct.error) as e:
+            self.close()
+            raise ValueError(f"Not a readable MPO file: {e}") from None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.data.close()
+
+    def _parse(self):
+        data = self.data
+        segment_start, segment_end, mp_offset = find_mp_segment(data)
+        self.mp_segment = (segment_start, segment_end)
+
+        order, first_ifd = tiff_byte_order(data, mp_offset)
+        index, attribute_ifd = read_ifd(data, mp_offset, first_ifd, order)
+        raw_entries = index.get(0xB002, b"")
+        self.entries = []  # (start, end) of every image in the file
+        for pos in range(0, len(raw_entries) - 15, 16):
+            _, size, offset = struct.unpack_from(order + "LLL", raw_entries, pos)
+            start = offset + mp_offset if offset else 0  # The first image starts at 0
+            if start + size > len(data):
+                raise ValueError("MP Index points past the end of the file")
+            self.entries.append((start, start + size))
+
+        # The MP Attribute IFD of the first image follows its MP Index IFD
+        self.attributes = {}
+        if attribute_ifd:
+            tags, _ = read_ifd(data, mp_offset, attribute_ifd, order)
+            self.attributes = {MP_ATTRIBUTE_TAGS[tag]: value for tag, value in tags.items() if tag in MP_ATTRIBUTE_TAGS}
+
+        self.parallax = self._read_parallax()  # Raw maker note value, its relation to the overlap is still unknown
+
+    def _read_parallax(self):
+        # Exif IFD -> MakerNote -> Nintendo camera info. Other cameras simply don't have it.
+        segment = find_segment(self.data, 0xFFE1, b"Exif\0\0")
+        if segment is None:
+            return None
+        tiff_start = segment[2]
+        try:
+            order, first_ifd = tiff_byte_order(self.data, tiff_start)
+            ifd0, _ = read_ifd(self.data, tiff_start, first_ifd, order)
+            if not ifd0.get(0x010F, b"").startswith(b"Nintendo") or not isinstance(ifd0.get(0x8769), int):
+                return None
+            note_pos = next((value_pos for tag, _, _, value_pos in ifd_entries(self.data, tiff_start, ifd0[0x8769], order)
+                             if tag == 0x927C), None)
+            if note_pos is None:
+                return None
+            # The maker note is a plain IFD, its offsets are relative to the Exif TIFF header
+            maker, _ = read_ifd(self.data, tiff_start, note_pos - tiff_start, order)
+            info = maker.get(NINTENDO_CAMERA_INFO)
+            if not info or len(info) < NINTENDO_PARALLAX_OFFSET + 4:
+                return None
+            (parallax,) = struct.unpack_from(order + "f", info, NINTENDO_PARALLAX_OFFSET)
+        except (ValueError, struct.error):
+            return None
+        return parallax if math.isfinite(parallax) else None
+
+    @property
+    def n_frames(self):
+        return len(self.entries)
+
+    def eye_range(self, index):
+        if index >= len(self.entries):
+            raise ValueError("MPO file must contain at least two frames.")
+        return self.entries[index]
+
+    def eye(self, index):
+        # Zero-copy view of the complete JPEG stream of one image, valid until the reader is closed
+        start, end = self.eye_range(index)
+        return memoryview(self.data)[start:end]
+
+    def open_eye(self, index):
+        # Opened as a plain JPEG, the MP headers inside the stream would make Pillow treat it as a whole MPO
+        with self.eye(index) as view:
+            return JpegImagePlugin.JpegImageFile(io.BytesIO(view))
+
+    @property
+    def size(self):
+        # Width and height of the first image, read from its start of frame marker
+        pos = 2
+        while pos + 4 <= len(self.data):
+            marker, length = struct.unpack_from(">HH", self.data, pos)
+            if marker >> 8 != 0xFF or marker == 0xFFDA:
+                break
+            if marker in (0xFFC0, 0xFFC1, 0xFFC2):
+                height, width = struct.unpack_from(">HH", self.data, pos + 5)
+                return width, height
+            pos += 2 + length
+        raise ValueError("MPO file has no image size.")
+
+# === DECODED FRAME CACHE ===
+# Slider edits only change the crop boxes, so the decoded frames of recently
+# viewed files are kept in memory (least recently used first out) instead of
+# decoding the whole MPO again on every tick.
+class FrameCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+        self._entries = OrderedDict()  # (path, scale) -> (mtime_ns, size_bytes, frames)
+        self._lock = threading.Lock()  # Shared by the Tk thread and the background render thread
+
+    def get(self, mpo_path, scale=1):
+        path = os.path.abspath(mpo_path)
+        key = (path, scale)
+        mtime = os.stat(path).st_mtime_ns
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] == mtime:
+                    self._entries.move_to_end(key)
+                    return entry[2]
+                self._discard(key)  # File changed on disk since it was cached
+
+        # Decode outside the lock so other threads can still use cached files meanwhile
+        frames = decode_frames(path, scale)
+        with self._lock:
+            self._store(key, mtime, frames)
+        return frames
+
+    def put(self, mpo_path, frames, scale=1):
+        # Cache frames that were decoded elsewhere, e.g. by a benchmark timing the decode on its own
+        path = os.path.abspath(mpo_path)
+        mtime = os.stat(path).st_mtime_ns
+        with self._lock:
+            self._store((path, scale), mtime, frames)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.used_bytes = 0
+
+    def _store(self, key, mtime, frames):
+        size = frames_size(frames)
+        if size > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self._discard(key)  # Another thread decoded the same file at the same time
+
+        while self._entries and self.used_bytes + size > self.max_bytes:
+            self._discard(next(iter(self._entries)))
+
+        self._entries[key] = (mtime, size, frames)
+        self.used_bytes += size
+
+    def _discard(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.used_bytes -= size
+
+
+def frames_size(frames):
+    return sum(frame.width * frame.height * len(frame.getbands()) for frame in frames)
+
+def decode_frames(mpo_path, scale=1):
+    # Only the left and right eye are used, any extra images in the container are never decoded
+    with stats.measure("open"):
+        mpo = MPOReader(mpo_path)
+    with mpo:
+        if mpo.n_frames < 2:
+            raise ValueError("MPO file must contain at least two frames.")
+
+        frames = []
+        for index in (0, 1):
+            with stats.measure("decode"), mpo.open_eye(index) as eye:
+                if scale > 1:
+                    # Let the JPEG decoder scale down while decoding (DCT scaling), much cheaper than a full decode
+                    eye.draft(eye.mode, (eye.width // scale, eye.height // scale))
+                frames.append(eye.copy())
+    return frames
+
+# What decode_frames raises for a broken or unsupported file. Pillow raises SyntaxError
+# for a JPEG it can't parse, and a DecompressionBombError isn't an OSError.
+DECODE_ERRORS = (OSError, ValueError, SyntaxError, Image.DecompressionBombError)
+
+def pick_preview_scale(mpo_path):
+    if not preview_max_width:
+        return 1
+    return pick_decode_scale(mpo_path, preview_max_width)
+
+def pick_decode_scale(mpo_path, min_width):
+    # Largest JPEG decode scale that still leaves the image at least min_width wide
+    with MPOReader(mpo_path) as mpo:
+        width = mpo.size[0]
+    for scale in (8, 4, 2):
+        if width // scale >= min_width:
+            return scale
+    return 1
+
+
+frame_cache = FrameCache(frame_cache_mb * 1024 * 1024)
+
+# === PREFETCH ===
+# While a file is being edited, the next few files are decoded into the frame
+# cache in the background so moving on doesn't wait for disk and JPEG decoding.
+# Moving to another file replaces the list, files that are no longer ahead of
+# the current one are not decoded anymore.
+class Prefetcher:
+    def __init__(self, cache, max_bytes):
+        self.cache = cache
+        self.max_bytes = max_bytes
+        self._cond = threading.Condition()
+        self._generation = 0
+        self._paths = []
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def retarget(self, paths):
+        with self._cond:
+            self._generation += 1
+            self._paths = list(paths)
+            self._cond.notify()
+
+    def cancel(self):
+        self.retarget([])
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._paths:
+                    self._cond.wait()
+                generation = self._generation
+                paths, self._paths = self._paths, []
+
+            warmed_bytes = 0
+            for mpo_path in paths:
+                if generation != self._generation or warmed_bytes >= self.max_bytes:
+                    break
+                try:
+                    frames = self.cache.get(mpo_path, pick_preview_scale(mpo_path))
+                except DECODE_ERRORS as e:
+                    # Leave the error for load_file to report once the user gets there
+                    print(f"⚠️ Prefetch failed for {os.path.basename(mpo_path)}: {e}")
+                    continue
+                warmed_bytes += frames_size(frames)
+
+# === THUMBNAIL CACHE ===
+# Small previews of both eyes for the browser, stored as PNG strips (left eye,
+# then right eye) in the output folder under the sha256 of the MPO. A file is
+# only decoded the first time, at the smallest JPEG scale that's big enough,
+# after that showing it costs a PNG read. Requests for files that were
+# scrolled out of view before their turn came are dropped.
+THUMB_DIR_NAME = "mpo_to_gif_thumbs"
+
+class ThumbnailCache:
+    def __init__(self, folder, size, workers):
+        self.folder = os.path.join(folder, THUMB_DIR_NAME)
+        self.index_path = os.path.join(self.folder, "index.json")
+        self.size = size
+        self.results = queue.Queue()  # (key, strip or None), picked up by the Tk thread
+        self.sources = {}  # Key -> source_info, so files that didn't change aren't hashed again
+        self._wanted = set()
+        self._queued = set()
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, encoding="utf-8") as f:
+                    self.sources = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Ignoring unreadable thumbnail index {self.index_path}: {e}")
+
+    def request(self, key, mpo_path):
+        with self._lock:
+            self._wanted.add(key)
+            if key in self._queued:
+                return
+            self._queued.add(key)
+        self._pool.submit(self._load, key, mpo_path)
+
+    def retarget(self, keys):
+        with self._lock:
+            self._wanted = set(keys)
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps(self.sources)
+            self._dirty = False
+        os.makedirs(self.folder, exist_ok=True)
+        temp_path = self.index_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(temp_path, self.index_path)
+
+    def _load(self, key, mpo_path):
+        strip = None
+        try:
+            with self._lock:
+                if key not in self._wanted:
+                    return
+                known = self.sources.get(key)
+            info = source_info(mpo_path, known)
+            if info is not known:
+                with self._lock:
+                    self.sources[key] = info
+                    self._dirty = True
+
+            path = os.path.join(self.folder, info["sha256"] + ".png")
+            try:
+                with Image.open(path) as cached:
+                    strip = cached.convert("RGB")
+            except OSError:
+                strip = self._generate(mpo_path, path)
+        except DECODE_ERRORS as e:  # Writing the cached PNG fails with OSError too
+            print(f"⚠️ No thumbnail for {key}: {e}")
+        finally:
+            with self._lock:
+                self._queued.discard(key)
+                wanted = key in self._wanted
+            if wanted:
+                self.results.put((key, strip))
+
+    def _generate(self, mpo_path, path):
+        frames = decode_frames(mpo_path, pick_decode_scale(mpo_path, self.size))
+        for frame in frames:
+            frame.thumbnail((self.size, self.size))
+        width, height = frames[0].size
+        strip = Image.new("RGB", (width * 2, height))
+        strip.paste(frames[0], (0, 0))
+        strip.paste(frames[1].resize((width, height)), (width, 0))
+
+        os.makedirs(self.folder, exist_ok=True)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        strip.save(temp_path, "PNG")
+        os.replace(temp_path, path)
+        return strip
+
+# === EDIT SESSION ===
+# The file being edited, its settings and its latest preview frames. Tk
+# callbacks write it while the render thread, prefetch and exports read it, so
+# every access goes through the lock. Settings leave the session as a
+# RenderSpec, an immutable snapshot that can be handed to threads and worker
+# processes as is.
+DEFAULT_DURATION = 175
+
+class RenderSpec(namedtuple("RenderSpec", "mpo_path overlap crop duration")):
+    # overlap None means auto overlap, crop is (left, top, right, bottom)
+    __slots__ = ()
+
+    @property
+    def crop_box(self):
+        return dict(zip("ltrb", self.crop))
+
+class EditSession:
+    __slots__ = ("_lock", "crop", "duration", "index", "left", "mpo_path", "name", "overlap", "right", "scale")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.index = 0
+        self.mpo_path = None
+        self.name = ""  # Output name of the current file
+        self.left = None
+        self.right = None
+        self.scale = 1  # JPEG decode scale of the preview frames
+        self.overlap = 0
+        self.crop = (0, 0, 0, 0)
+        self.duration = DEFAULT_DURATION
+
+    def open(self, index, mpo_path, name):
+        with self._lock:
+            self.index = index
+            self.mpo_path = mpo_path
+            self.name = name
+
+    def reset(self):
+        self.update(overlap=0, crop=(0, 0, 0, 0), duration=DEFAULT_DURATION)
+
+    def update(self, **settings):
+        with self._lock:
+            for name, value in settings.items():
+                setattr(self, name, value)
+
+    def set_crop(self, side, value):
+        with self._lock:
+            index = "ltrb".index(side)
+            self.crop = self.crop[:index] + (value,) + self.crop[index + 1:]
+
+    def set_frames(self, left, right, scale):
+        with self._lock:
+            self.left, self.right, self.scale = left, right, scale
+
+    def frames(self):
+        with self._lock:
+            return self.left, self.right, self.scale
+
+    def spec(self):
+        with self._lock:
+            return RenderSpec(self.mpo_path, self.overlap, self.crop, self.duration)
+
+    @property
+    def crop_box(self):
+        return dict(zip("ltrb", self.crop))
+
+    @property
+    def preview_interval(self):
+        return self.duration / 1000.0
+
+
+session = EditSession()
 
-    left_box = (left_start, 0, width + left_start, height)
-    right_box = (right_start, 0, width + right_start, height)
+# === IMAGE PROCESSING ===
+def render(spec, scale=1):
+    return process_images(spec.mpo_path, spec.overlap, spec.crop_box, scale)
 
-    left_image = frames[0].crop(left_box)
-    right_image = frames[1].crop(right_box)
+def process_images(mpo_path, overlap, crop_box=None, scale=1):
+    if crop_box is None:
+        crop_box = {"l": 0, "t": 0, "r": 0, "b": 0}
+    frames = frame_cache.get(mpo_path, scale)
 
-    crop_l, crop_t, crop_r, crop_b = crop["l"], crop["t"], crop["r"], crop["b"]
-    new_width = left_image.width - crop_l - crop_r
-    new_height = left_image.height - crop_t - crop_b
+    if scale > 1:
+        # Overlap and crop are in full resolution pixels, bring them down to the decoded size
+        overlap = round(overlap / scale)
+        crop_box = {side: round(value / scale) for side, value in crop_box.items()}
 
-    left_image = left_image.crop((crop_l, crop_t, crop_l + new_width, crop_t + new_height))
-    right_image = right_image.crop((crop_l, crop_t, crop_l + new_width, crop_t + new_height))
+    with stats.measure("crop"):
+        left_box, right_box = render_boxes(frames[0].size, overlap, crop_box)
+        left_image = frames[0].crop(left_box)
+        right_image = frames[1].crop(right_box)
 
     return left_image, right_image
 
+def render_boxes(size, overlap, crop_box):
+    # The overlap shift and the crop folded into one box per eye, so each eye is cut out of the
+    # decoded frame in a single crop. Parts of a box outside the frame (from the shift) come out black.
+    width, height = size
+    crop_l, crop_t, crop_r, crop_b = crop_box["l"], crop_box["t"], crop_box["r"], crop_box["b"]
+    if crop_l + crop_r >= width or crop_t + crop_b >= height:
+        raise ValueError("Crop leaves nothing of the image.")
+
+    left_box = (crop_l - overlap, crop_t, width - crop_r - overlap, height - crop_b)
+    right_box = (crop_l + overlap, crop_t, width - crop_r + overlap, height - crop_b)
+    return left_box, right_box
+
+# === AUTO ALIGN ===
+# The right eye sees the scene shifted sideways compared to the left eye. The
+# shift is found with phase correlation along the rows of small grayscale
+# copies of both eyes, and half of it is the overlap that lines the eyes up.
+def estimate_overlap(left, right, region=None, max_width=256, max_overlap=100):
+    if region is not None:
+        left = left.crop(region)
+        right = right.crop(region)
+
+    factor = max(1.0, left.width / max_width)
+    size = (max(1, round(left.width / factor)), max(1, round(left.height / factor)))
+    eyes = [np.asarray(img.convert("L").resize(size, Image.Resampling.BILINEAR), dtype=np.float32)
+            for img in (left, right)]
+
+    window = np.hanning(size[0]).astype(np.float32)  # Soften the edges, the shift isn't circular
+    spectra = []
+    for eye in eyes:
+        eye = (eye - eye.mean(axis=1, keepdims=True)) * window
+        spectra.append(np.fft.rfft(eye, axis=1))
+
+    # Summing over the rows gives one correlation for the whole region
+    cross = (spectra[1] * np.conj(spectra[0])).sum(axis=0)
+    cross /= np.abs(cross) + 1e-9
+    correlation = np.fft.irfft(cross, n=size[0])
+
+    # Only look at shifts the overlap slider can reach
+    limit = min(size[0] // 2, int(2 * max_overlap / factor) + 1)
+    shifts = np.r_[0:limit + 1, -limit:0]
+    values = correlation[shifts]
+    best = int(np.argmax(values))
+    shift = float(shifts[best])
+
+    # Refine to a fraction of a pixel with a parabola through the peak and its neighbours
+    before, after = values[best - 1], values[(best + 1) % len(values)]
+    curvature = before - 2 * values[best] + after
+    if curvature < 0:
+        shift += 0.5 * (before - after) / curvature
+
+    overlap = round(shift * factor / 2)
+    return max(-max_overlap, min(max_overlap, overlap))
+
+def auto_overlap(mpo_path, region=None, scale=1):
+    # region is in full resolution pixels of the original left/right frames
+    frames = frame_cache.get(mpo_path, scale)
+    if region is not None and scale > 1:
+        region = tuple(round(value / scale) for value in region)
+    with stats.measure("align"):
+        return estimate_overlap(frames[0], frames[1], region, max_overlap=round(100 / scale)) * scale
+
+# === WIGGLE SEQUENCES ===
+# Instead of jumping straight from one eye to the other, the animated formats
+# can pass through views in between. "fade" blends the eyes, "warp" moves
+# every pixel part of the way along its disparity (found by block matching
+# reduced grayscale copies), so things really seem to turn instead of ghosting.
+# The sequence is a ping-pong loop that reuses its views on the way back.
+WIGGLE_METHODS = ("fade", "warp")
+WIGGLE_MATCH_WIDTH = 160  # Disparity is estimated on copies this wide
+WIGGLE_MAX_DISPARITY = 12  # Largest disparity searched, in pixels of the reduced copies
+WIGGLE_MIN_FRAME_MS = 20  # Shorter frames get slowed down by most GIF viewers
+
+def box_filter(values, radius):
+    # Mean over a square window around every pixel, from cumulative sums
+    size = 2 * radius + 1
+    summed = np.pad(np.pad(values, radius, mode="edge").cumsum(0).cumsum(1), ((1, 0), (1, 0)))
+    return (summed[size:, size:] - summed[:-size, size:] - summed[size:, :-size] + summed[:-size, :-size]) / size ** 2
+
+def estimate_disparity(left, right):
+    # Horizontal offset of every pixel of the left eye in the right eye (left x minus right x), in full size pixels
+    scale = max(1.0, left.width / WIGGLE_MATCH_WIDTH)
+    size = (max(1, round(left.width / scale)), max(1, round(left.height / scale)))
+    small_left = np.asarray(left.convert("L").resize(size, Image.Resampling.BOX), dtype=np.float32)
+    small_right = np.asarray(right.convert("L").resize(size, Image.Resampling.BOX), dtype=np.float32)
+
+    search = WIGGLE_MAX_DISPARITY
+    padded_right = np.pad(small_right, ((0, 0), (search, search)), mode="edge")
+    costs = np.stack([
+        box_filter(np.abs(small_left - padded_right[:, search - d:search - d + size[0]]), 2)
+        for d in range(-search, search + 1)
+    ])
+    disparity = box_filter((costs.argmin(axis=0) - search).astype(np.float32), 2)  # Smooths out mismatches
+    full = Image.fromarray(disparity * np.float32(scale)).resize(left.size, Image.Resampling.BILINEAR)
+    return np.asarray(full)
+
+def interpolate_view(left, right, disparity, t):
+    # View at t between the eyes, 0 is the left eye and 1 the right. left and right are float arrays.
+    if disparity is None:
+        view = left * (1 - t) + right * t
+    else:
+        height, width = disparity.shape
+        x = np.arange(width, dtype=np.float32)
+        rows = np.arange(height)[:, None]
+        left_x = np.clip(np.rint(x + t * disparity), 0, width - 1).astype(np.intp)
+        right_x = np.clip(np.rint(x - (1 - t) * disparity), 0, width - 1).astype(np.intp)
+        view = left[rows, left_x] * (1 - t) + right[rows, right_x] * t
+    return Image.fromarray(np.rint(view).astype(np.uint8))
+
+def build_wiggle(left, right, duration, steps=None, method=None):
+    # Returns the frames and their durations: left, the views, right and the views back to left.
+    # The eyes are held for duration, the views in between share one duration.
+    steps = wiggle_steps if steps is None else steps
+    method = method or wiggle_method
+    if steps <= 0:
+        return [left, right], [duration, duration]
+    if method not in WIGGLE_METHODS:
+        raise ValueError(f"Unknown wiggle method {method!r}, choose from {', '.join(WIGGLE_METHODS)}")
+
+    with stats.measure("wiggle"):
+        left_pixels = np.asarray(left.convert("RGB"), dtype=np.float32)
+        right_pixels = np.asarray(right.convert("RGB"), dtype=np.float32)
+        disparity = estimate_disparity(left, right) if method == "warp" else None
+        # The views are independent and NumPy releases the GIL, so they are rendered side by side
+        positions = [step / (steps + 1) for step in range(1, steps + 1)]
+        with ThreadPoolExecutor(max_workers=min(steps, os.cpu_count() or 1)) as pool:
+            views = list(pool.map(lambda t: interpolate_view(left_pixels, right_pixels, disparity, t), positions))
+
+    view_duration = max(WIGGLE_MIN_FRAME_MS, duration // (steps + 1))
+    frames = [left, *views, right, *reversed(views)]
+    durations = [duration] + [view_duration] * steps + [duration] + [view_duration] * steps
+    return frames, durations
+
 # === GIF CREATION ===
-def create_gif(images, output_path, duration):
-    images[0].save(
+GIF_QUANTIZERS = {
+    "mediancut": Image.Quantize.MEDIANCUT,
+    "maxcoverage": Image.Quantize.MAXCOVERAGE,
+    "fastoctree": Image.Quantize.FASTOCTREE,
+    "libimagequant": Image.Quantize.LIBIMAGEQUANT,  # Only if Pillow was built with libimagequant
+}
+GIF_DITHERS = {
+    "none": Image.Dither.NONE,
+    "floyd": Image.Dither.FLOYDSTEINBERG,
+}
+GIF_PALETTE_SAMPLE_PIXELS = 160_000  # Roughly how many pixels the palette is built from
+
+def create_gif(images, output_path, duration, quantizer=None, dither=None, scale=None):
+    with stats.measure("gif"):
+        write_gif(images, output_path, duration, quantizer, dither, scale)
+    print(f"🎞️ GIF saved to: {output_path}")
+
+def write_gif(images, output_path, duration, quantizer=None, dither=None, scale=None):
+    quantizer = quantizer or gif_quantizer
+    dither = dither or gif_dither
+    scale = scale or gif_scale
+
+    frames = [img.convert("RGB") for img in images]
+    if scale != 1:
+        size = (max(1, round(frames[0].width * scale)), max(1, round(frames[0].height * scale)))
+        frames = [frame.resize(size, Image.Resampling.LANCZOS) for frame in frames]
+
+    # One palette built from all frames at once, so colors don't flicker between the eyes.
+    # It is built from reduced copies, the palette barely changes and median cut gets a lot faster.
+    total_pixels = frames[0].width * frames[0].height * len(frames)
+    reduce = max(1, math.ceil(math.sqrt(total_pixels / GIF_PALETTE_SAMPLE_PIXELS)))
+    samples = [frame.reduce(reduce) if reduce > 1 else frame for frame in frames]
+    strip = Image.new("RGB", (samples[0].width, samples[0].height * len(samples)))
+    for i, sample in enumerate(samples):
+        strip.paste(sample, (0, i * sample.height))
+    palette = strip.quantize(colors=256, method=GIF_QUANTIZERS[quantizer])
+    # Later frames are stored whole. Making the unchanged pixels transparent was tried, but the
+    # eyes differ in most pixels and the scattered transparent ones made the GIFs larger.
+    gif_images = [frame.quantize(palette=palette, dither=GIF_DITHERS[dither]) for frame in frames]
+
+    gif_images[0].save(
         output_path,
         save_all=True,
-        append_images=images[1:],
+        append_images=gif_images[1:],
         duration=duration,
-        loop=0
+        loop=0,
+        optimize=False  # Would give every frame its own reordered palette
     )
-    print(f"🎞️ GIF saved to: {output_path}")
 
 # === MP4 CREATION ===
-def create_mp4(images, output_path, duration):
+def frame_repeats(durations):
+    # MP4 frames all last equally long: the frame rate of the shortest duration, longer frames repeated
+    fps = max(1, round(1000 / min(durations)))
+    return fps, [max(1, round(duration * fps / 1000)) for duration in durations]
+
+def create_mp4(images, output_path, duration, preset=None, crf=None):
+    # duration is one for all frames or a list with one per frame. Encoder errors are raised,
+    # convert_file reports the file as failed.
+    from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+
+    durations = duration if isinstance(duration, list) else [duration] * len(images)
+    fps, repeats = frame_repeats(durations)
+    preset = preset or mp4_preset
+    crf = mp4_crf if crf is None else crf
+
+    ffmpeg_params = ["-movflags", "faststart"]
+    if crf is not None:
+        ffmpeg_params += ["-crf", str(crf)]
+
+    # Raw RGB frames are piped straight from memory into ffmpeg
+    with stats.measure("mp4"), FFMPEG_VideoWriter(
+        output_path,
+        images[0].size,
+        fps,
+        codec="libx264",
+        preset=preset,
+        ffmpeg_params=ffmpeg_params
+    ) as writer:
+        for img, repeat in zip(images, repeats):
+            frame = np.asarray(img.convert("RGB"))
+            for _ in range(repeat):
+                writer.write_frame(frame)
+
+    print(f"🎥 MP4 saved to: {output_path}")
+
+# === MP4 COMPILATION ===
+# Writes the frames of a whole batch through one ffmpeg session instead of one
+# encoder start per file. "chapters" gives a single MP4 with a chapter per file
+# (added with a stream copy remux once the encode is done), "segments" has the
+# same session cut the stream into one MP4 per file at forced keyframes.
+COMPILATION_MODES = ("chapters", "segments")
+
+class Compilation:
+    def __init__(self, path, mode="chapters", loops=4, preset=None, crf=None):
+        self.path = path
+        self.mode = mode
+        self.loops = loops  # Times every file's frames are repeated, a single flicker is over too fast
+        self.fps = None  # Set by the frame durations of the first file
+        self.preset = preset or mp4_preset
+        self.crf = mp4_crf if crf is None else crf
+        self.size = None  # Of the first file, later files are padded or shrunk to fit
+        self.clip_frames = None
+        self.chapters = []  # (title, name, first frame, end frame)
+        self.frame_count = 0
+        self._writer = None
+
+    def _open(self, size, durations):
+        from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+
+        self.size = (size[0] + size[0] % 2, size[1] + size[1] % 2)  # x264 needs even sizes
+        self.fps, repeats = frame_repeats(durations)
+        clip_frames = self.clip_frames = sum(repeats) * self.loops
+        params = ["-crf", str(self.crf)] if self.crf is not None else []
+        if self.mode == "segments":
+            # A keyframe on the first frame of every file, and a cut at the first keyframe
+            # past half a frame before the end of the file
+            segment_time = (clip_frames - 0.5) / self.fps
+            params += ["-force_key_frames", f"expr:eq(mod(n,{clip_frames}),0)",
+                       "-f", "segment", "-segment_time", f"{segment_time:.6f}", "-reset_timestamps", "1",
+                       "-segment_format_options", "movflags=+faststart"]
+            target = os.path.splitext(self.path)[0] + "_%05d.mp4"
+        else:
+            target = os.path.splitext(self.path)[0] + ".encoding.mp4"
+        self._writer = FFMPEG_VideoWriter(target, self.size, self.fps, codec="libx264", preset=self.preset,
+                                          ffmpeg_params=params)
+
+    def add(self, title, name, frames, durations):
+        with stats.measure("compilation"):
+            if self._writer is None:
+                self._open(frames[0].size, durations)
+            repeats = [max(1, round(duration * self.fps / 1000)) for duration in durations]
+            if sum(repeats) * self.loops != self.clip_frames and self.mode == "segments":
+                raise ValueError("Every file needs the same number of frames to cut segments.")
+
+            arrays = [np.asarray(ImageOps.pad(frame.convert("RGB"), self.size) if frame.size != self.size
+                                 else frame.convert("RGB"))
+                      for frame in frames]
+            start = self.frame_count
+            for _ in range(self.loops):
+                for array, repeat in zip(arrays, repeats):
+                    for _ in range(repeat):
+                        self._writer.write_frame(array)
+            self.frame_count += sum(repeats) * self.loops
+            self.chapters.append((title, name, start, self.frame_count))
+
+    def close(self):
+        # Returns the paths of the finished MP4 files
+        if self._writer is None:
+            return []
+        with stats.measure("compilation"):
+            self._writer.close()
+            if self.mode == "segments":
+                return self._rename_segments()
+            return [self._add_chapters()]
+
+    def _add_chapters(self):
+        from moviepy.config import FFMPEG_BINARY
+
+        base = os.path.splitext(self.path)[0]
+        lines = [";FFMETADATA1"]
+        for title, _, start, end in self.chapters:
+            title = "".join("\\" + c if c in "=;#\\\n" else c for c in title)
+            lines += ["[CHAPTER]", "TIMEBASE=1/1000", f"START={start * 1000 // self.fps}",
+                      f"END={end * 1000 // self.fps}", f"title={title}"]
+        with open(base + ".chapters.txt", "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+        try:
+            subprocess.run([FFMPEG_BINARY, "-y", "-loglevel", "error", "-i", base + ".encoding.mp4",
+                            "-i", base + ".chapters.txt", "-map", "0", "-map_metadata", "1", "-map_chapters", "1",
+                            "-codec", "copy", "-movflags", "faststart", self.path],
+                           check=True, capture_output=True, text=True)
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(f"Adding chapters failed: {e.stderr.strip()}") from None
+        finally:
+            os.remove(base + ".chapters.txt")
+        os.remove(base + ".encoding.mp4")
+        return self.path
+
+    def _rename_segments(self):
+        base = os.path.splitext(self.path)[0]
+        paths = []
+        for number, (_, name, _, _) in enumerate(self.chapters):
+            path = f"{base}_{name}.mp4"
+            os.replace(f"{base}_{number:05d}.mp4", path)
+            paths.append(path)
+        return paths
+
+# === JPEG EXPORT ===
+def copy_eye_jpegs(mpo_path, left_path, right_path):
+    # The eyes are stored as complete JPEG streams inside the MPO, copy their bytes as they are
+    with MPOReader(mpo_path) as mpo:
+        segment_start, segment_end = mpo.mp_segment
+        left_start, left_end = mpo.eye_range(0)
+        right_start, right_end = mpo.eye_range(1)
+        # Leave out the MP Index, it would point to a right eye that isn't in the copied file
+        with open(left_path, "wb") as f:
+            f.write(mpo.data[left_start:segment_start])
+            f.write(mpo.data[segment_end:left_end])
+        with open(right_path, "wb") as f:
+            f.write(mpo.data[right_start:right_end])
+
+def save_eye_jpegs(mpo_path, left, right, left_path, right_path):
+    # Re-encode with the quantization tables and chroma subsampling the 3DS used,
+    # so the exported JPG loses as little as possible compared to the original
+    with MPOReader(mpo_path) as mpo:
+        for index, img, path in ((0, left, left_path), (1, right, right_path)):
+            with mpo.open_eye(index) as eye:
+                img.save(path, qtables=eye.quantization, subsampling=JpegImagePlugin.get_sampling(eye))
+
+# === STEREO MODES ===
+# Still images that show both eyes at once, made from the same aligned pair as
+# the GIF. Everything is whole-array channel math on the frames.
+ANAGLYPH_METHODS = ("color", "half", "gray")
+LUMA_WEIGHTS = (0.299, 0.587, 0.114)
+
+def stereo_arrays(left, right):
+    return np.asarray(left.convert("RGB")), np.asarray(right.convert("RGB"))
+
+def make_anaglyph(left, right, method="color"):
+    # Red/cyan: the red channel comes from the left eye, green and blue from the right.
+    # "half" and "gray" trade color for less retinal rivalry on saturated reds.
+    left, right = stereo_arrays(left, right)
+    if method == "color":
+        out = right.copy()
+        out[..., 0] = left[..., 0]
+    elif method == "half":
+        out = right.copy()
+        out[..., 0] = (left @ LUMA_WEIGHTS).clip(0, 255)
+    elif method == "gray":
+        out = np.empty_like(right)
+        out[..., 0] = (left @ LUMA_WEIGHTS).clip(0, 255)
+        out[..., 1:] = (right @ LUMA_WEIGHTS).clip(0, 255)[..., None]
+    else:
+        raise ValueError(f"Unknown anaglyph method {method!r}, choose from {', '.join(ANAGLYPH_METHODS)}")
+    return Image.fromarray(out)
+
+def make_side_by_side(left, right, half=False, swap=False, gap=0):
+    # swap puts the right eye on the left for cross-eyed viewing, half squeezes
+    # each eye to half width so the pair keeps the size of one frame
+    left, right = stereo_arrays(left, right)
+    if swap:
+        left, right = right, left
+    if half:
+        width = left.shape[1] // 2 * 2
+        left = ((left[:, 0:width:2].astype(np.uint16) + left[:, 1:width:2]) // 2).astype(np.uint8)
+        right = ((right[:, 0:width:2].astype(np.uint16) + right[:, 1:width:2]) // 2).astype(np.uint8)
+    parts = [left, right]
+    if gap:
+        parts.insert(1, np.zeros((left.shape[0], gap, 3), dtype=np.uint8))
+    return Image.fromarray(np.concatenate(parts, axis=1))
+
+# === OUTPUT WRITERS ===
+# Every output format is a writer registered under a name, with the options it
+# accepts and their defaults. Only the formats in output_formats are written,
+# and writer_options can override the defaults per format, e.g.
+# {"webp": {"quality": 90}}. A writer gets the frames and the output path
+# without extension, and returns the paths of the files it wrote. Animated
+# writers get the whole wiggle sequence with a duration per frame, the others
+# the left and right eye with the frame duration.
+OUTPUT_WRITERS = {}
+
+def output_writer(name, animated=False, **defaults):
+    def register(write):
+        OUTPUT_WRITERS[name] = {"write": write, "options": defaults, "animated": animated}
+        return write
+    return register
+
+def writer_settings(name, options=None):
+    options = writer_options if options is None else options
+    return {**OUTPUT_WRITERS[name]["options"], **options.get(name, {})}
+
+@output_writer("jpg")
+def write_jpg(frames, base_path, duration, options, mpo_path=None, untransformed=False):
+    left_path, right_path = f"{base_path}_left.jpg", f"{base_path}_right.jpg"
+    with stats.measure("jpeg"):
+        if mpo_path is None:
+            frames[0].save(left_path)
+            frames[1].save(right_path)
+        elif untransformed:
+            copy_eye_jpegs(mpo_path, left_path, right_path)
+        else:
+            save_eye_jpegs(mpo_path, frames[0], frames[1], left_path, right_path)
+    return [left_path, right_path]
+
+@output_writer("gif", animated=True, quantizer=None, dither=None, scale=None)
+def write_gif_output(frames, base_path, duration, options, **_):
+    create_gif(frames, base_path + ".gif", duration, **options)
+    return [base_path + ".gif"]
+
+@output_writer("mp4", animated=True, preset=None, crf=None)
+def write_mp4_output(frames, base_path, duration, options, **_):
+    create_mp4(frames, base_path + ".mp4", duration, **options)
+    return [base_path + ".mp4"]
+
+@output_writer("webp", animated=True, quality=80, method=4, lossless=False)
+def write_webp(frames, base_path, duration, options, **_):
+    # method is the speed knob, 0 is fastest and 6 smallest
+    path = base_path + ".webp"
+    with stats.measure("webp"):
+        frames[0].save(path, save_all=True, append_images=frames[1:], duration=duration, loop=0, **options)
+    print(f"🖼️ WebP saved to: {path}")
+    return [path]
+
+@output_writer("apng", animated=True, compress_level=6, optimize=False)
+def write_apng(frames, base_path, duration, options, **_):
+    path = base_path + ".png"
+    with stats.measure("apng"):
+        frames[0].save(path, format="PNG", save_all=True, append_images=frames[1:], duration=duration, loop=0,
+                       **options)
+    print(f"🖼️ APNG saved to: {path}")
+    return [path]
+
+@output_writer("avif", animated=True, quality=75, speed=6)
+def write_avif(frames, base_path, duration, options, **_):
+    if not features.check("avif"):
+        raise RuntimeError("This Pillow build can't write AVIF files.")
+    path = base_path + ".avif"
+    with stats.measure("avif"):
+        frames[0].save(path, save_all=True, append_images=frames[1:], duration=duration, loop=0, **options)
+    print(f"🖼️ AVIF saved to: {path}")
+    return [path]
+
+def save_stereo(image, path, quality):
+    image.save(path, quality=quality)
+    print(f"👓 Stereo image saved to: {path}")
+    return [path]
+
+@output_writer("anaglyph", method="color", quality=95)
+def write_anaglyph(frames, base_path, duration, options, **_):
+    with stats.measure("stereo"):
+        image = make_anaglyph(frames[0], frames[1], options["method"])
+        return save_stereo(image, base_path + "_anaglyph.jpg", options["quality"])
+
+@output_writer("sbs", gap=0, quality=95)
+def write_side_by_side(frames, base_path, duration, options, **_):
+    with stats.measure("stereo"):
+        image = make_side_by_side(frames[0], frames[1], gap=options["gap"])
+        return save_stereo(image, base_path + "_sbs.jpg", options["quality"])
+
+@output_writer("sbs_half", quality=95)
+def write_half_side_by_side(frames, base_path, duration, options, **_):
+    with stats.measure("stereo"):
+        image = make_side_by_side(frames[0], frames[1], half=True)
+        return save_stereo(image, base_path + "_sbs_half.jpg", options["quality"])
+
+@output_writer("crosseye", gap=0, quality=95)
+def write_cross_eye(frames, base_path, duration, options, **_):
+    with stats.measure("stereo"):
+        image = make_side_by_side(frames[0], frames[1], swap=True, gap=options["gap"])
+        return save_stereo(image, base_path + "_crosseye.jpg", options["quality"])
+
+def parse_writer_option(text):
+    # "webp.quality=90" -> ("webp", "quality", 90)
     try:
-        fps = round(1000 / duration)
-
-        with tempfile.TemporaryDirectory() as temp_dir:
-            temp_paths = []
-            for i, img in enumerate(images):
-                temp_path = os.path.join(temp_dir, f"frame_{i:03d}.png")
-                img.save(temp_path)
-                temp_paths.append(temp_path)
-
-            clip = ImageSequenceClip(temp_paths, fps=fps)
-            clip.write_videofile(
-                output_path,
-                codec="libx264",
-                audio=False,
-                preset="medium",
-                ffmpeg_params=["-movflags", "faststart"]
-            )
-            clip.close()
+        target, value = text.split("=", 1)
+        name, key = target.split(".", 1)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected FORMAT.OPTION=VALUE, got {text!r}") from None
+    if name not in OUTPUT_WRITERS or key not in OUTPUT_WRITERS[name]["options"]:
+        known = ", ".join(f"{n}.{k}" for n, info in OUTPUT_WRITERS.items() for k in info["options"])
+        raise argparse.ArgumentTypeError(f"unknown option {target!r}, known options: {known}")
+
+    for convert in (int, float):
+        try:
+            return name, key, convert(value)
+        except ValueError:
+            pass
+    return name, key, {"true": True, "false": False, "none": None}.get(value.lower(), value)
+
+def parse_formats(text):
+    if text.strip().lower() == "none":
+        return []  # Only useful with a batch --compilation
+    formats = [name.strip().lower() for name in text.split(",") if name.strip()]
+    unknown = [name for name in formats if name not in OUTPUT_WRITERS]
+    if unknown or not formats:
+        raise argparse.ArgumentTypeError(f"unknown formats {unknown}, choose from {', '.join(OUTPUT_WRITERS)}")
+    return formats
+
+# === EXPORT ===
+def export_images(left, right, folder, name, duration, mpo_path=None, untransformed=False, formats=None,
+                  sequence=None, settings=None):
+    # settings is a batch_settings() snapshot, taken when the export was queued. The editor's
+    # format checkboxes change the module level settings while exports are still running.
+    if not os.path.exists(folder):
+        os.makedirs(folder, exist_ok=True)
+
+    settings = settings or batch_settings()
+    formats = settings["output_formats"] if formats is None else formats
+    if not formats:
+        return []
+    # The animated formats share one wiggle sequence (see build_wiggle), unless the caller already built it
+    if sequence is None and any(OUTPUT_WRITERS[fmt]["animated"] for fmt in formats):
+        sequence = build_wiggle(left, right, duration, settings["wiggle_steps"], settings["wiggle_method"])
+
+    # The writers don't depend on each other, so they all run at the same time
+    base_path = os.path.join(folder, name)
+    with ThreadPoolExecutor(max_workers=len(formats)) as pool:
+        futures = []
+        for fmt in formats:
+            frames, durations = sequence if OUTPUT_WRITERS[fmt]["animated"] else ([left, right], duration)
+            futures.append(pool.submit(OUTPUT_WRITERS[fmt]["write"], frames, base_path, durations,
+                                       writer_settings(fmt, settings["writer_options"]), mpo_path=mpo_path, untransformed=untransformed))
+        return [path for future in futures for path in future.result()]
+
+# === EDIT INDEX ===
+# The output folder keeps a record of what was done with every MPO: its
+# settings, a hash of the source and the timestamps of the files written for
+# it. The editor uses it to resume where it stopped and to restore settings,
+# the batch mode to skip files whose outputs are still up to date.
+EDIT_INDEX_NAME = "mpo_to_gif_index.json"
+EDIT_INDEX_SAVE_INTERVAL = 5  # Seconds between saves, flush() writes whatever is left
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def source_info(mpo_path, known=None):
+    # Only hash the file again if its size or modification time changed
+    stat = os.stat(mpo_path)
+    if known and known.get("size") == stat.st_size and known.get("mtime_ns") == stat.st_mtime_ns:
+        return known
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": file_digest(mpo_path)}
+
+def make_index_entry(spec, outputs, auto=False, settings=None):
+    output_times = {}
+    for path in outputs:
+        try:
+            output_times[os.path.basename(path)] = os.stat(path).st_mtime_ns
+        except OSError:
+            output_times[os.path.basename(path)] = None  # Not written
+    return {
+        "status": "exported",
+        "overlap": spec.overlap,
+        "auto_overlap": auto,
+        "crop": spec.crop_box,
+        "duration": spec.duration,
+        "settings": settings or batch_settings(),
+        "source": source_info(spec.mpo_path),
+        "outputs": output_times,
+        "exported_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+class EditIndex:
+    def __init__(self, folder):
+        self.folder = folder
+        self.path = os.path.join(folder, EDIT_INDEX_NAME)
+        self.entries = {}  # MPO path relative to the input folder -> entry
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._saved_at = 0.0
+
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    self.entries = json.load(f)["files"]
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️ Ignoring unreadable edit index {self.path}: {e}")
+
+    def get(self, key):
+        with self._lock:
+            return self.entries.get(key)
+
+    def record(self, key, entry):
+        with self._lock:
+            self.entries[key] = entry
+            self._dirty = True
+            due = time.monotonic() - self._saved_at >= EDIT_INDEX_SAVE_INTERVAL
+        if due:
+            self.flush()
+
+    def mark_skipped(self, key, mpo_path):
+        self.record(key, {"status": "skipped", "source": source_info(mpo_path)})
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps({"version": 1, "files": self.entries}, indent=1)
+            self._dirty = False
+            self._saved_at = time.monotonic()
+
+        # Write next to the index and swap it in, an interrupted save never leaves a broken index
+        os.makedirs(self.folder, exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(temp_path, self.path)
+
+    def is_done(self, key, mpo_path):
+        # Exported or skipped before, and the MPO hasn't changed since
+        entry = self.get(key)
+        if not entry or entry.get("status") not in ("exported", "skipped"):
+            return False
+        known = entry.get("source")
+        return source_info(mpo_path, known)["sha256"] == known.get("sha256")
+
+    def is_up_to_date(self, key, spec, settings):
+        entry = self.get(key)
+        if not entry or entry.get("status") != "exported":
+            return False
+
+        if spec.overlap is None:
+            if not entry["auto_overlap"]:
+                return False
+        elif entry["auto_overlap"] or entry["overlap"] != spec.overlap:
+            return False
+        if entry["crop"] != spec.crop_box or entry["duration"] != spec.duration or entry["settings"] != settings:
+            return False
+
+        if source_info(spec.mpo_path, entry["source"])["sha256"] != entry["source"]["sha256"]:
+            return False
+
+        for name, mtime in entry["outputs"].items():
+            try:
+                if os.stat(os.path.join(self.folder, name)).st_mtime_ns != mtime:
+                    return False
+            except OSError:
+                return False
+        return True
+
+# === EXPORT QUEUE ===
+# Export hands the file over to background threads and returns straight away,
+# so the next photo can be edited while the previous one is still encoding.
+# The queue is bounded, so Export waits once too many files are still pending.
+class ExportQueue:
+    def __init__(self, workers, max_pending):
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.done = 0
+        self.failed = []
+        for _ in range(workers):
+            threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, key, job):
+        with self._lock:
+            self.pending += 1
+        self._queue.put((key, job))
+
+    def _run(self):
+        while True:
+            key, job = self._queue.get()
+            mpo_path, error, entry, _ = convert_file(job)
+            try:
+                if entry:
+                    edit_index.record(key, entry)
+            except OSError as e:
+                error = f"could not update the edit index: {e}"
+            finally:
+                # Always counted, close_when_exports_done waits for pending to reach 0
+                with self._lock:
+                    self.pending -= 1
+                    if error:
+                        self.failed.append((mpo_path, error))
+                    else:
+                        self.done += 1
+            if error:
+                print(f"❌ Export failed for {os.path.basename(mpo_path)}: {error}")
+            else:
+                print(f"✅ Exported {job[2]}")
+
+# === HEADLESS BATCH ===
+def init_batch_worker(settings, keep_frames=False):
+    # Files are never revisited in a batch, the cache only needs room for the file being converted
+    # (auto overlap and the render share its frames)
+    global batch_keep_frames
+    frame_cache.max_bytes = batch_frame_cache_mb * 1024 * 1024
+    batch_keep_frames = keep_frames
+    globals().update(settings)
+
+def convert_file(job, keep_frames=False):
+    # A job is (RenderSpec, output folder, output name, settings). Without output folder the file
+    # is only rendered, for the compilation of a batch. settings is a batch_settings() snapshot,
+    # None uses the current settings. keep_frames also returns the wiggle sequence, as (frames, durations).
+    spec, folder, name, settings = job
+    settings = settings or batch_settings()
+    mpo_path = spec.mpo_path
+    entry = None
+    try:
+        auto = spec.overlap is None
+        if auto:
+            spec = spec._replace(overlap=auto_overlap(mpo_path))
+        left, right = render(spec)
+        sequence = None
+        if keep_frames:
+            sequence = build_wiggle(left, right, spec.duration, settings["wiggle_steps"], settings["wiggle_method"])
+        if folder is not None:
+            untransformed = spec.overlap == 0 and not any(spec.crop)
+            outputs = export_images(left, right, folder, name, spec.duration, mpo_path, untransformed,
+                                    sequence=sequence, settings=settings)
+            entry = make_index_entry(spec, outputs, auto, settings)
+    except Exception as e:  # noqa: BLE001 - one broken file must not stop the batch, it's reported instead
+        return mpo_path, f"{type(e).__name__}: {e}", None, None
+    return mpo_path, None, entry, sequence
+
+def convert_file_in_worker(job):
+    # Also send back the stage timings of this file, the worker's stats are lost otherwise
+    return convert_file(job, batch_keep_frames) + (stats.drain(),)
+
+def map_ahead(pool, func, jobs, ahead):
+    # Like pool.map over (key, job) pairs, yielding (key, result) in order, but only keeps
+    # `ahead` jobs submitted at a time. pool.map takes all jobs at once, which waits for the
+    # whole scan, and the results (the frames for a compilation) pile up while the main
+    # process works through them.
+    futures = deque()
+    for key, job in jobs:
+        futures.append((key, pool.submit(func, job)))
+        if len(futures) >= ahead:
+            key, future = futures.popleft()
+            yield key, future.result()
+    while futures:
+        key, future = futures.popleft()
+        yield key, future.result()
+
+def batch_settings():
+    # Module level settings the worker processes need to share with this process, copied so
+    # later changes (like the editor's format checkboxes) don't reach a queued export
+    return {name: copy.deepcopy(globals()[name]) for name in
+            ("mp4_preset", "mp4_crf", "gif_quantizer", "gif_dither", "gif_scale",
+             "output_formats", "writer_options", "wiggle_steps", "wiggle_method")}
+
+def run_batch(input_path, output_path, overlap, crop, duration, workers=None, force=False, report_path=None,
+              compilation_path=None):
+    os.makedirs(output_path, exist_ok=True)
+
+    index = EditIndex(output_path)
+    settings = batch_settings()
+    scan_cache = load_scan_cache(output_path, input_path)
+    found = []
+    keys = []
+    reused = []
+    scanned = False
+
+    def pending_jobs():
+        nonlocal scanned
+        # Workers already start on the first files while the folders are still being scanned
+        for f in scan_mpo_files(input_path, scan_cache):
+            found.append(f)
+            mpo_path = os.path.join(input_path, f)
+            spec = RenderSpec(mpo_path, overlap, tuple(crop), duration)
+            folder = output_path
+            if not force and index.is_up_to_date(f, spec, settings):
+                if compilation is None:
+                    continue
+                folder = None  # Its outputs are fine, but the compilation still needs its frames
+                reused.append(f)
+            keys.append(f)
+            yield f, (spec, folder, output_name(f), settings)
+
+        scanned = True
+        save_scan_cache(output_path, input_path, scan_cache)
+        print(f"📂 Found {len(found)} MPO files.")
+        if len(keys) - len(reused) < len(found):
+            print(f"⏭️ Skipping {len(found) - len(keys) + len(reused)} files that are already up to date.")
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    compilation = None
+    if compilation_path:
+        compilation = Compilation(compilation_path, compilation_mode, compilation_loops)
+
+    failed = []
+    converted = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_batch_worker,
+                                 initargs=(settings, compilation is not None)) as pool:
+            results = map_ahead(pool, convert_file_in_worker, pending_jobs(), 2 * (workers or os.cpu_count() or 1))
+            for done, (key, (mpo_path, error, entry, frames, file_stats)) in enumerate(results, start=1):
+                stats.merge(file_stats)
+                progress = f"[{done}/{len(keys)}]" if scanned else f"[{done}]"  # The total is known once the scan is done
+                if error:
+                    failed.append((mpo_path, error))
+                    print(f"❌ {progress} {key}: {error}")
+                    continue
+                if entry:
+                    index.record(key, entry)
+                    converted += 1
+                # The frames go into the running encoder as soon as they arrive, in scan order
+                if compilation is not None:
+                    compilation.add(key, output_name(key), *frames)
+                print(f"✅ {progress} {key}" + ("" if entry else " (compilation only)"))
+        if compilation is not None:
+            for path in compilation.close():
+                print(f"🎬 Compilation saved to: {path}")
+    finally:
+        index.flush()
+
+    print(f"🏁 Converted {converted} of {len(keys) - len(reused)} files.")
+    if stats.stages:
+        print(f"⏱️ {stats.summary()}")
+    if report_path:
+        stats.write_report(report_path)
+    for mpo_path, error in failed:
+        print(f"⚠️ Failed: {mpo_path} ({error})")
+    return 1 if failed else 0
+
+# === BACKGROUND RENDERING ===
+# Slider callbacks only record what should be rendered. A single worker thread
+# renders the most recent request, older requests that were replaced in the
+# meantime are never rendered, and results that went stale while rendering are
+# dropped. Finished renders are picked up from the Tk loop by poll_renders.
+class RenderScheduler:
+    def __init__(self, render, on_done):
+        self._render = render
+        self._on_done = on_done
+        self._cond = threading.Condition()
+        self._generation = 0
+        self._pending = None
+        self._finished = None
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def request(self, *args, **kwargs):
+        with self._cond:
+            self._generation += 1
+            self._pending = (self._generation, args, kwargs)
+            self._cond.notify()
+
+    def cancel(self):
+        with self._cond:
+            self._generation += 1
+            self._pending = None
+            self._finished = None
+
+    def poll(self):
+        with self._cond:
+            finished, self._finished = self._finished, None
+        if finished is not None:
+            self._on_done(*finished)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None:
+                    self._cond.wait()
+                generation, args, kwargs = self._pending
+                self._pending = None
+
+            try:
+                finished = (self._render(*args, **kwargs), None)
+            except Exception as e:  # noqa: BLE001 - handed to the Tk thread, which reports it
+                finished = (None, e)
+
+            with self._cond:
+                if generation == self._generation:
+                    self._finished = finished
+
+def apply_render(images, error):
+    if error is not None:
+        print(f"⚠️ Render failed: {error}")
+        return
+    session.set_frames(*images, session.scale)
+    refresh_preview()
 
+def poll_renders():
+    render_scheduler.poll()
+    window.after(render_poll_interval, poll_renders)
 
-        print(f"🎥 MP4 saved to: {output_path}")
-    except Exception as e:
-        print(f"❌ MP4 export failed: {e}")
+def request_render():
+    render_scheduler.request(session.spec(), scale=session.scale)
 
 # === PREVIEW UPDATE ===
+def refresh_preview():
+    # Converting to a PhotoImage uploads the whole frame to Tk, so only do it once per edit
+    global preview_photos
+    left, right, _ = session.frames()
+    with stats.measure("photoimage"):
+        preview_photos = (ImageTk.PhotoImage(left), ImageTk.PhotoImage(right))
+
 def update_preview():
     global toggle, photo
-    img = left_img if toggle else right_img
-    photo = ImageTk.PhotoImage(img)
+    photo = preview_photos[0] if toggle else preview_photos[1]
     canvas.image = photo
     canvas.itemconfig(image_container, image=photo)
     toggle = not toggle
-    window.after(int(preview_interval * 1000), update_preview)
+    window.after(int(session.preview_interval * 1000), update_preview)
+
+# === THUMBNAIL BROWSER ===
+# A window next to the editor with a wiggling thumbnail of every file. Only the
+# rows in view (and the next one) have canvas items and PhotoImages, so the
+# folder size doesn't matter. Clicking a thumbnail opens that file.
+class ThumbnailBrowser:
+    def __init__(self, parent, cache, columns, on_pick, on_close):
+        self.cache = cache
+        self.columns = columns
+        self.on_pick = on_pick
+        self.cell = cache.size + 8
+        self.items = {}  # File index -> canvas image item
+        self.photos = {}  # Key -> (left, right) PhotoImage of the files in view
+        self.toggle = True
+        self.known_files = 0
+
+        self.top = tk.Toplevel(parent)
+        self.top.title("Browse")
+        self.top.configure(bg=colors["bg_main"])
+        self.top.geometry(f"+{parent.winfo_rootx() + parent.winfo_width() + 10}+{parent.winfo_rooty()}")
+        self.top.protocol("WM_DELETE_WINDOW", on_close)
+
+        self.canvas = tk.Canvas(self.top, bg=colors["bg_main"], highlightthickness=0,
+                                width=columns * self.cell, height=6 * self.cell, yscrollincrement=self.cell)
+        scrollbar = ttk.Scrollbar(self.top, orient="vertical", command=self.scroll)
+        self.canvas.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side="right", fill="y")
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self.current_box = self.canvas.create_rectangle(0, 0, 0, 0, outline=colors["fg_value"], width=2)
+
+        self.canvas.bind("<Configure>", lambda event: self.refresh())
+        self.canvas.bind("<Button-1>", self.click)
+        self.canvas.bind("<MouseWheel>", lambda event: self.scroll("scroll", -1 if event.delta > 0 else 1, "units"))
+        self.canvas.bind("<Button-4>", lambda event: self.scroll("scroll", -1, "units"))
+        self.canvas.bind("<Button-5>", lambda event: self.scroll("scroll", 1, "units"))
+
+        self.refresh()
+        self._poll_id = self.top.after(render_poll_interval, self.poll)
+        self._wiggle_id = self.top.after(int(session.preview_interval * 1000), self.wiggle)
+
+    def scroll(self, *args):
+        self.canvas.yview(*args)
+        self.refresh()
+
+    def visible_range(self):
+        top = int(self.canvas.canvasy(0)) // self.cell
+        bottom = int(self.canvas.canvasy(self.canvas.winfo_height())) // self.cell + 2  # One row ahead
+        return range(top * self.columns, min(len(mpo_files), bottom * self.columns))
+
+    def refresh(self):
+        self.known_files = len(mpo_files)
+        rows = math.ceil(self.known_files / self.columns)
+        self.canvas.configure(scrollregion=(0, 0, self.columns * self.cell, rows * self.cell))
+
+        visible = self.visible_range()
+        for index in [index for index in self.items if index not in visible]:
+            self.canvas.delete(self.items.pop(index))
+        keys = {mpo_files[index] for index in visible}
+        self.photos = {key: photos for key, photos in self.photos.items() if key in keys}
+
+        self.cache.retarget(keys)
+        for index in visible:
+            key = mpo_files[index]
+            if index not in self.items:
+                row, col = divmod(index, self.columns)
+                self.items[index] = self.canvas.create_image(
+                    col * self.cell + self.cell // 2, row * self.cell + self.cell // 2)
+            if key in self.photos:
+                self.canvas.itemconfig(self.items[index], image=self.photos[key][0 if self.toggle else 1])
+            else:
+                self.cache.request(key, os.path.join(input_folder, key))
+
+        row, col = divmod(session.index, self.columns)
+        self.canvas.coords(self.current_box, col * self.cell + 1, row * self.cell + 1,
+                           (col + 1) * self.cell - 1, (row + 1) * self.cell - 1)
+        self.canvas.tag_raise(self.current_box)
+
+    def poll(self):
+        changed = len(mpo_files) != self.known_files  # The scan found more files
+        while True:
+            try:
+                key, strip = self.cache.results.get_nowait()
+            except queue.Empty:
+                break
+            if strip is None:
+                continue
+            width = strip.width // 2
+            self.photos[key] = (ImageTk.PhotoImage(strip.crop((0, 0, width, strip.height))),
+                                ImageTk.PhotoImage(strip.crop((width, 0, strip.width, strip.height))))
+            changed = True
+        if changed:
+            self.refresh()
+        self._poll_id = self.top.after(render_poll_interval * 4, self.poll)
+
+    def wiggle(self):
+        self.toggle = not self.toggle
+        for index, item in self.items.items():
+            photos = self.photos.get(mpo_files[index])
+            if photos:
+                self.canvas.itemconfig(item, image=photos[0 if self.toggle else 1])
+        self._wiggle_id = self.top.after(int(session.preview_interval * 1000), self.wiggle)
+
+    def click(self, event):
+        row = int(self.canvas.canvasy(event.y)) // self.cell
+        col = int(self.canvas.canvasx(event.x)) // self.cell
+        index = row * self.columns + col
+        if col < self.columns and index < len(mpo_files):
+            self.on_pick(index)
+
+    def close(self):
+        self.top.after_cancel(self._poll_id)
+        self.top.after_cancel(self._wiggle_id)
+        self.cache.retarget(())
+        self.cache.flush()
+        self.top.destroy()
+
+def toggle_browser():
+    global thumbnail_browser
+    if thumbnail_browser is not None:
+        thumbnail_browser.close()
+        thumbnail_browser = None
+    else:
+        thumbnail_browser = ThumbnailBrowser(window, thumbnail_cache, thumb_columns, load_file, toggle_browser)
 
 # === LOAD NEXT FILE ===
 def load_file(index):
-    global left_img, right_img, canvas, image_container, photo, base_filename, current_index, toggle
+    global photo, toggle
 
-    if index >= len(mpo_files):
+    if not file_scan.wait_for(index + 1):
         print("✅ All files processed.")
-        window.destroy()
+        prefetcher.cancel()
+        close_when_exports_done()
         return
 
-    current_index = index
+    render_scheduler.cancel()  # Renders still running belong to the previous file
+    prefetcher.retarget(
+        os.path.join(input_folder, f) for f in mpo_files[index + 1:index + 1 + prefetch_count]
+    )
     toggle = True
     mpo_path = os.path.join(input_folder, mpo_files[index])
-    base_filename = os.path.splitext(mpo_files[index])[0]  # ← use original filename
-
-    left_img, right_img = process_images(mpo_path, overlap)
-    canvas.config(width=left_img.width, height=left_img.height)
-    photo = ImageTk.PhotoImage(left_img)
+    session.open(index, mpo_path, output_name(mpo_files[index]))  # ← use original filename
+    entry = edit_index.get(mpo_files[index])
+    if entry and entry.get("status") == "exported":
+        restore_settings(entry)
+
+    scale = pick_preview_scale(mpo_path)
+    left, right = render(session.spec(), scale)
+    session.set_frames(left, right, scale)
+    canvas.config(width=left.width, height=left.height)
+    refresh_preview()
+    photo = preview_photos[0]
     canvas.image = photo
     canvas.itemconfig(image_container, image=photo)
-    status_label.config(text=f"Editing {mpo_files[index]}")
+    if thumbnail_browser is not None:
+        thumbnail_browser.refresh()  # Moves the highlight to this file
+    update_status()
+
+def restore_settings(entry):
+    # Files exported in an earlier session come back with the settings they were exported with
+    if not entry or entry.get("status") != "exported":
+        return
+    session.update(overlap=entry["overlap"], crop=tuple(entry["crop"][side] for side in "ltrb"),
+                   duration=entry["duration"])
+    update_sliders()
+
+def update_sliders():
+    spec = session.spec()
+    slider_widgets["Overlap"].set(spec.overlap)
+    slider_widgets["Crop Left"].set(spec.crop[0])
+    slider_widgets["Crop Top"].set(spec.crop[1])
+    slider_widgets["Crop Right"].set(spec.crop[2])
+    slider_widgets["Crop Bottom"].set(spec.crop[3])
+    slider_widgets["Frame Duration (ms)"].set(spec.duration)
+
+def update_status():
+    scanning = "" if file_scan.done.is_set() else "+"
+    text = f"Editing {mpo_files[session.index]} ({session.index + 1} of {len(mpo_files)}{scanning})"
+    if export_queue.pending or export_queue.failed:
+        text += f"  ·  exporting {export_queue.pending}, {export_queue.done} done"
+        if export_queue.failed:
+            text += f", {len(export_queue.failed)} failed"
+    timings = stats.summary()
+    if timings:
+        text += f"\n{timings}"
+    status_label.config(text=text)
+
+def poll_exports():
+    update_status()
+    window.after(export_poll_interval, poll_exports)
+
+def close_when_exports_done():
+    if export_queue.pending:
+        status_label.config(text=f"Finishing {export_queue.pending} exports...")
+        window.after(export_poll_interval, close_when_exports_done)
+        return
+
+    for mpo_path, error in export_queue.failed:
+        print(f"⚠️ Failed: {mpo_path} ({error})")
+    edit_index.flush()
+    thumbnail_cache.flush()
+    if stats.stages:
+        stats.write_report(os.path.join(output_folder, REPORT_NAME))
+    window.destroy()
 
 # === CONTROL ACTIONS ===
 def update_overlap(val):
-    global overlap, left_img, right_img
-    overlap = int(val)
-    left_img, right_img = process_images(os.path.join(input_folder, mpo_files[current_index]), overlap)
+    session.update(overlap=int(val))
+    request_render()
 
 def update_crop(side, val):
-    global crop, left_img, right_img
-    crop[side] = int(val)
-    left_img, right_img = process_images(os.path.join(input_folder, mpo_files[current_index]), overlap)
+    session.set_crop(side, int(val))
+    request_render()
 
 def update_duration(val):
-    global frame_duration, preview_interval
-    frame_duration = int(val)
-    preview_interval = frame_duration / 1000.0
+    session.update(duration=int(val))
 
 def export_current():
-    if not os.path.exists(output_folder):
-        os.makedirs(output_folder)
-
-    left_img.save(os.path.join(output_folder, f"{base_filename}_left.jpg"))
-    right_img.save(os.path.join(output_folder, f"{base_filename}_right.jpg"))
-    
-    gif_path = os.path.join(output_folder, f"{base_filename}.gif")
-    create_gif([left_img, right_img], gif_path, frame_duration)
-    
-    mp4_path = os.path.join(output_folder, f"{base_filename}.mp4")
-    create_mp4([left_img, right_img], mp4_path, frame_duration)
-    
-    print(f"✅ Exported {base_filename}")
-    load_file(current_index + 1)
+    # The export is rendered again from these settings at full resolution in the background
+    export_queue.submit(mpo_files[session.index], (session.spec(), output_folder, session.name, batch_settings()))
+    print(f"📤 Queued {session.name} for export")
+    load_file(session.index + 1)
 
 def skip_current():
     print("⏭️ Skipped current file.")
-    load_file(current_index + 1)
+    edit_index.mark_skipped(mpo_files[session.index], session.mpo_path)
+    load_file(session.index + 1)
 
 def skip_ahead():
     try:
@@ -417,18 +2309,18 @@ def skip_ahead():
         print("⚠️ Invalid skip value.")
         return
 
-    remaining = len(mpo_files) - current_index - 1
+    file_scan.wait_for(session.index + x + 1)
+    remaining = len(mpo_files) - session.index - 1
     if x > remaining:
         print(f"❌ Cannot skip {x} files — only {remaining} remain.")
     else:
         print(f"⏭️ Skipping ahead {x} files...")
-        load_file(current_index + x)
+        load_file(session.index + x)
 
 def exit_script():
-    global window
     print("🛑 Exiting script.")
     if window:
-        window.destroy()
+        close_when_exports_done()
 
 def jump_to_click(event, scale):
     value = scale.cget("from") + (scale.cget("to") - scale.cget("from")) * event.x / scale.winfo_width()
@@ -436,7 +2328,94 @@ def jump_to_click(event, scale):
 
 
 # === START ===
-def main():
+def main(argv=None):
+    global preview_max_width, prefetch_count, mp4_preset, mp4_crf, gif_quantizer, gif_dither, gif_scale
+    global compilation_mode, compilation_loops, wiggle_steps, wiggle_method
+    if getattr(sys, "frozen", False):
+        # In the PyInstaller exe the batch worker processes start by running main() again,
+        # freeze_support() turns them into workers. Only imported there, it's slow to import.
+        import multiprocessing
+        multiprocessing.freeze_support()
+    parser = argparse.ArgumentParser(prog="mpo-to-gif", description="Batch editing of all your amazing Nintendo 3DS images")
+    subparsers = parser.add_subparsers(dest="command")
+
+    def add_output_arguments(target, subcommand=False):
+        # These work before and after "batch". The subcommand's defaults would overwrite the values
+        # given before it, so its copies have none, and its --option values are added to the others.
+        def default(value):
+            return argparse.SUPPRESS if subcommand else value
+        target.add_argument("--formats", type=parse_formats, default=default(list(output_formats)),
+                            help=f"comma separated output formats out of {', '.join(OUTPUT_WRITERS)} "
+                                 f"(default: {','.join(output_formats)})")
+        target.add_argument("--option", type=parse_writer_option, action="append", default=[],
+                            dest="subcommand_option" if subcommand else "option", metavar="FORMAT.OPTION=VALUE",
+                            help="set an output option, e.g. webp.quality=90 or apng.compress_level=1 (repeatable)")
+        target.add_argument("--wiggle-steps", type=int, default=default(wiggle_steps),
+                            help="views rendered between the eyes for a smooth wiggle in GIF, MP4, WebP, APNG "
+                                 f"and AVIF, 0 flips straight between the eyes (default: {wiggle_steps})")
+        target.add_argument("--wiggle-method", choices=WIGGLE_METHODS, default=default(wiggle_method),
+                            help=f"how the views in between are made (default: {wiggle_method})")
+
+    batch = subparsers.add_parser("batch", help="convert a whole folder without opening the editor")
+    batch.add_argument("input_folder", help="folder containing the MPO files")
+    batch.add_argument("output_folder", help="folder for the exported JPG, GIF and MP4 files")
+    batch.add_argument("--overlap", type=int, default=0, help="overlap applied to every file (default: 0)")
+    batch.add_argument("--auto-overlap", action="store_true",
+                       help="estimate the overlap of every file from its left and right eye instead of using --overlap")
+    batch.add_argument("--crop", type=int, nargs=4, default=[0, 0, 0, 0], metavar=("L", "T", "R", "B"),
+                       help="pixels cropped from the left, top, right and bottom (default: 0 0 0 0)")
+    batch.add_argument("--duration", type=int, default=175, help="frame duration in ms (default: 175)")
+    batch.add_argument("--force", action="store_true",
+                       help="convert every file again, even if its outputs are up to date")
+    batch.add_argument("--report", help="write per stage timings and peak memory to this .json or .csv file")
+    batch.add_argument("--workers", type=int, default=None, help="number of worker processes (default: all cores)")
+    add_output_arguments(batch, subcommand=True)
+    batch.add_argument("--compilation", metavar="PATH.mp4",
+                       help="also stream every file into one MP4 encoder session, see --compilation-mode")
+    batch.add_argument("--compilation-mode", choices=COMPILATION_MODES, default=compilation_mode,
+                       help="one MP4 with a chapter per file, or one MP4 per file cut from the same session "
+                            f"(default: {compilation_mode})")
+    batch.add_argument("--compilation-loops", type=int, default=compilation_loops,
+                       help=f"flickers per file in the compilation (default: {compilation_loops})")
+    batch.add_argument("--mp4-preset", default=mp4_preset, help=f"x264 preset for the MP4 files (default: {mp4_preset})")
+    batch.add_argument("--mp4-crf", type=int, default=mp4_crf, help="x264 CRF for the MP4 files (default: encoder default)")
+    batch.add_argument("--gif-quantizer", choices=GIF_QUANTIZERS, default=gif_quantizer,
+                       help=f"method used to build the GIF palette (default: {gif_quantizer})")
+    batch.add_argument("--gif-dither", choices=GIF_DITHERS, default=gif_dither,
+                       help=f"dithering applied when mapping to the GIF palette (default: {gif_dither})")
+    batch.add_argument("--gif-scale", type=float, default=gif_scale,
+                       help=f"resize factor for the GIF, e.g. 0.5 for half size (default: {gif_scale})")
+
+    parser.add_argument("--preview-width", type=int, default=preview_max_width,
+                        help="decode large photos at reduced size for the live preview, as long as they stay at "
+                             f"least this wide; 0 always previews at full size (default: {preview_max_width})")
+
+    parser.add_argument("--prefetch", type=int, default=prefetch_count,
+                        help=f"number of upcoming files decoded in the background while editing (default: {prefetch_count})")
+    add_output_arguments(parser)
+
+    args = parser.parse_args(argv)
+
+    output_formats[:] = args.formats
+    wiggle_steps = args.wiggle_steps
+    wiggle_method = args.wiggle_method
+    for name, key, value in args.option + getattr(args, "subcommand_option", []):
+        writer_options.setdefault(name, {})[key] = value
+
+    if args.command == "batch":
+        mp4_preset = args.mp4_preset
+        mp4_crf = args.mp4_crf
+        gif_quantizer = args.gif_quantizer
+        gif_dither = args.gif_dither
+        gif_scale = args.gif_scale
+        compilation_mode = args.compilation_mode
+        compilation_loops = args.compilation_loops
+        overlap_value = None if args.auto_overlap else args.overlap
+        raise SystemExit(run_batch(args.input_folder, args.output_folder, overlap_value, args.crop,
+                                   args.duration, args.workers, args.force, args.report, args.compilation))
+
+    preview_max_width = args.preview_width
+    prefetch_count = args.prefetch
     launch_splash(start_main_app)
 
 